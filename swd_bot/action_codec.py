@@ -0,0 +1,110 @@
+from typing import Tuple, Type
+
+import numpy as np
+from swd.action import Action, BuyCardAction, DiscardCardAction, BuildWonderAction, PickWonderAction, \
+    PickProgressTokenAction, PickStartPlayerAction, DestroyCardAction, PickDiscardedCardAction
+from swd.entity_manager import EntityManager
+from swd.states.game_state import GameState
+
+CARDS_COUNT = EntityManager.cards_count()
+WONDERS_COUNT = EntityManager.wonders_count()
+PROGRESS_TOKENS = list(EntityManager.progress_token_names())
+
+BUY_CARD_OFFSET = 0
+DISCARD_CARD_OFFSET = BUY_CARD_OFFSET + CARDS_COUNT
+BUILD_WONDER_OFFSET = DISCARD_CARD_OFFSET + CARDS_COUNT
+PICK_WONDER_OFFSET = BUILD_WONDER_OFFSET + WONDERS_COUNT * CARDS_COUNT
+PICK_PROGRESS_TOKEN_OFFSET = PICK_WONDER_OFFSET + WONDERS_COUNT
+PICK_START_PLAYER_OFFSET = PICK_PROGRESS_TOKEN_OFFSET + len(PROGRESS_TOKENS)
+DESTROY_CARD_OFFSET = PICK_START_PLAYER_OFFSET + 2
+PICK_DISCARDED_CARD_OFFSET = DESTROY_CARD_OFFSET + CARDS_COUNT
+ACTION_CODES_COUNT = PICK_DISCARDED_CARD_OFFSET + CARDS_COUNT
+
+POLICY_SIZE = 2 * CARDS_COUNT + WONDERS_COUNT
+
+ACTION_OFFSETS = np.array([
+    BUY_CARD_OFFSET,
+    DISCARD_CARD_OFFSET,
+    BUILD_WONDER_OFFSET,
+    PICK_WONDER_OFFSET,
+    PICK_PROGRESS_TOKEN_OFFSET,
+    PICK_START_PLAYER_OFFSET,
+    DESTROY_CARD_OFFSET,
+    PICK_DISCARDED_CARD_OFFSET,
+])
+
+ACTION_TYPES = [
+    BuyCardAction,
+    DiscardCardAction,
+    BuildWonderAction,
+    PickWonderAction,
+    PickProgressTokenAction,
+    PickStartPlayerAction,
+    DestroyCardAction,
+    PickDiscardedCardAction,
+]
+
+ENCODERS = {
+    BuyCardAction: lambda a: BUY_CARD_OFFSET + a.card_id,
+    DiscardCardAction: lambda a: DISCARD_CARD_OFFSET + a.card_id,
+    BuildWonderAction: lambda a: BUILD_WONDER_OFFSET + a.wonder_id * CARDS_COUNT + a.card_id,
+    PickWonderAction: lambda a: PICK_WONDER_OFFSET + a.wonder_id,
+    PickProgressTokenAction: lambda a: PICK_PROGRESS_TOKEN_OFFSET + PROGRESS_TOKENS.index(a.progress_token),
+    PickStartPlayerAction: lambda a: PICK_START_PLAYER_OFFSET + a.player_index,
+    DestroyCardAction: lambda a: DESTROY_CARD_OFFSET + a.card_id,
+    PickDiscardedCardAction: lambda a: PICK_DISCARDED_CARD_OFFSET + a.card_id,
+}
+
+
+def _policy_indices() -> np.ndarray:
+    indices = np.full(ACTION_CODES_COUNT, -1, dtype=np.int64)
+    indices[BUY_CARD_OFFSET: BUY_CARD_OFFSET + CARDS_COUNT] = np.arange(CARDS_COUNT)
+    indices[DISCARD_CARD_OFFSET: DISCARD_CARD_OFFSET + CARDS_COUNT] = np.arange(CARDS_COUNT) + CARDS_COUNT
+    wonder_ids = np.arange(WONDERS_COUNT * CARDS_COUNT) // CARDS_COUNT
+    indices[BUILD_WONDER_OFFSET: PICK_WONDER_OFFSET] = wonder_ids + 2 * CARDS_COUNT
+    return indices
+
+
+# action code -> index in the policy head output (buy cards, discard cards, build wonders), -1 if not covered
+POLICY_INDICES = _policy_indices()
+
+
+class ActionCodec:
+    @staticmethod
+    def encode(action: Action) -> int:
+        return ENCODERS[type(action)](action)
+
+    @staticmethod
+    def kind(code: int) -> Type[Action]:
+        return ACTION_TYPES[ActionCodec.kind_index(code)]
+
+    @staticmethod
+    def kind_index(code: int) -> int:
+        return int(np.searchsorted(ACTION_OFFSETS, code, side="right")) - 1
+
+    @staticmethod
+    def decode(code: int, state: GameState) -> Action:
+        kind_index = ActionCodec.kind_index(code)
+        value = code - ACTION_OFFSETS[kind_index]
+        action_type = ACTION_TYPES[kind_index]
+        if action_type in (BuyCardAction, DiscardCardAction):
+            return action_type(value, ActionCodec.card_pos(state, value))
+        elif action_type == BuildWonderAction:
+            wonder_id, card_id = divmod(value, CARDS_COUNT)
+            return BuildWonderAction(wonder_id, card_id, ActionCodec.card_pos(state, card_id))
+        elif action_type == PickProgressTokenAction:
+            return PickProgressTokenAction(PROGRESS_TOKENS[value])
+        return action_type(value)
+
+    @staticmethod
+    def card_pos(state: GameState, card_id: int) -> Tuple[int, int]:
+        pos = np.argwhere(state.cards_board_state.card_places == card_id)[0]
+        return int(pos[0]), int(pos[1])
+
+    @staticmethod
+    def policy_index(code: int) -> int:
+        return POLICY_INDICES[code]
+
+    @staticmethod
+    def is_pick_discarded_card(code: int) -> bool:
+        return PICK_DISCARDED_CARD_OFFSET <= code < ACTION_CODES_COUNT
@@ -0,0 +1,66 @@
+import threading
+from collections import OrderedDict
+from typing import Sequence, Tuple, Optional
+
+import numpy as np
+from swd.states.game_state import GameState
+
+from swd_bot.agents.policy_agent import PolicyAgent
+from swd_bot.state_hash import StateHash
+
+
+# LRU cache of PolicyAgent predictions keyed by state hash, shared by all searches of an agent
+class EvaluationCache:
+    def __init__(self, torch_agent: PolicyAgent, max_size: int = 1 << 16):
+        self.torch_agent = torch_agent
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        # the pondering thread and the agent share the cache
+        self.lock = threading.Lock()
+
+    def get(self, key: int) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        with self.lock:
+            value = self.entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return value
+
+    def put(self, key: int, value: Tuple[np.ndarray, np.ndarray]):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def predict(self, state: GameState) -> Tuple[np.ndarray, np.ndarray]:
+        key = StateHash.hash(state)
+        value = self.get(key)
+        if value is None:
+            value = self.torch_agent.predict(state)
+            self.put(key, value)
+        return value
+
+    def predict_batch(self, states: Sequence[GameState]) -> Tuple[np.ndarray, np.ndarray]:
+        keys = [StateHash.hash(state) for state in states]
+        values = [self.get(key) for key in keys]
+        missed = [i for i, value in enumerate(values) if value is None]
+        if len(missed) > 0:
+            pred_actions, pred_winners = self.torch_agent.predict_batch([states[i] for i in missed])
+            for j, i in enumerate(missed):
+                values[i] = (pred_actions[j], pred_winners[j])
+                self.put(keys[i], values[i])
+        return np.stack([value[0] for value in values]), np.stack([value[1] for value in values])
+
+    def hit_rate(self) -> float:
+        return self.hits / max(self.hits + self.misses, 1)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.hits = 0
+            self.misses = 0
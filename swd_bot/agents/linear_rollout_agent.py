@@ -0,0 +1,85 @@
+import random
+from typing import Sequence, Tuple, List, Optional
+
+import numpy as np
+from swd.action import Action, BuyCardAction, DiscardCardAction, BuildWonderAction
+from swd.agents import Agent
+from swd.bonuses import BONUSES, INSTANT_BONUSES
+from swd.entity_manager import EntityManager
+from swd.states.game_state import GameState, GameStatus
+
+from swd_bot.agents.rule_based_agent import RuleBasedAgent
+from swd_bot.model.model_paths import ModelPaths
+
+LINEAR_ACTION_TYPES = {BuyCardAction: 0, DiscardCardAction: 1, BuildWonderAction: 2}
+
+
+# Softmax over linear scores of card features, one weights row per action type, distilled from TorchAgent
+class LinearRolloutAgent(Agent):
+    def __init__(self, path: Optional[str] = None):
+        with np.load(path if path is not None else ModelPaths.rollout_policy_path()) as data:
+            self.weights = data["weights"]
+        self.cards_features = LinearRolloutAgent.card_features()
+        self.rule_based_agent = RuleBasedAgent()
+
+    # bias, price and bonuses of every card, one row per card id
+    @staticmethod
+    def card_features() -> np.ndarray:
+        features = []
+        for card_id in range(EntityManager.cards_count()):
+            card = EntityManager.card(card_id)
+            instant_bonuses = np.zeros(len(INSTANT_BONUSES))
+            for bonus in card.instant_bonuses:
+                instant_bonuses[bonus] += 1
+            features.append(np.concatenate([
+                [1, card.price.coins],
+                card.price.resources,
+                [card.bonuses.get(bonus, 0) for bonus in range(len(BONUSES))],
+                instant_bonuses,
+            ]))
+        return np.array(features, dtype=np.float64)
+
+    @staticmethod
+    def action_features(actions: Sequence[Action]) -> Tuple[np.ndarray, np.ndarray]:
+        types = np.array([LINEAR_ACTION_TYPES[type(action)] for action in actions], dtype=np.int64)
+        cards = np.array([action.card_id for action in actions], dtype=np.int64)
+        return types, cards
+
+    @staticmethod
+    def logits(weights: np.ndarray, types: np.ndarray, features: np.ndarray) -> np.ndarray:
+        return (weights[types] * features).sum(axis=1)
+
+    @staticmethod
+    def segment_softmax(logits: np.ndarray, counts: np.ndarray) -> np.ndarray:
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        logits = logits - np.repeat(np.maximum.reduceat(logits, starts), counts)
+        exp = np.exp(logits)
+        return exp / np.repeat(np.add.reduceat(exp, starts), counts)
+
+    def choose_action(self, state: GameState, possible_actions: Sequence[Action]) -> Action:
+        return self.choose_actions([state], [possible_actions])[0]
+
+    def choose_actions(self, states: Sequence[GameState], actions_lists: Sequence[Sequence[Action]]) -> List[Action]:
+        selected_actions = [None] * len(states)
+        normal_turns = []
+        for i, (state, actions) in enumerate(zip(states, actions_lists)):
+            if state.game_status == GameStatus.NORMAL_TURN:
+                normal_turns.append(i)
+            else:
+                selected_actions[i] = self.rule_based_agent.choose_action(state, actions)
+        if len(normal_turns) == 0:
+            return selected_actions
+
+        # all card actions of the batch are scored at once
+        all_actions = [action for i in normal_turns for action in actions_lists[i]]
+        counts = np.array([len(actions_lists[i]) for i in normal_turns])
+        types, cards = LinearRolloutAgent.action_features(all_actions)
+        logits = LinearRolloutAgent.logits(self.weights, types, self.cards_features[cards])
+        probs = LinearRolloutAgent.segment_softmax(logits, counts)
+        offset = 0
+        for i, count in zip(normal_turns, counts.tolist()):
+            cumulative = np.cumsum(probs[offset:offset + count])
+            choice = min(int(np.searchsorted(cumulative, random.random() * cumulative[-1])), count - 1)
+            selected_actions[i] = actions_lists[i][choice]
+            offset += count
+        return selected_actions
@@ -1,5 +1,9 @@
+import functools
+import math
 import random
-from typing import Sequence
+import threading
+import time
+from typing import Sequence, Callable, Optional, List, Union
 
 import numpy as np
 from swd.action import Action
@@ -7,33 +11,203 @@ from swd.agents import Agent, RandomAgent
 from swd.game import Game
 from swd.states.game_state import GameState, GameStatus
 
+from swd_bot.action_codec import ActionCodec
+from swd_bot.agents.evaluation_cache import EvaluationCache
+from swd_bot.agents.linear_rollout_agent import LinearRolloutAgent
+from swd_bot.agents.numpy_agent import NumpyAgent
+from swd_bot.agents.policy_agent import PolicyAgent
 from swd_bot.agents.rule_based_agent import RuleBasedAgent
-from swd_bot.agents.torch_agent import TorchAgent
+from swd_bot.mcts.endgame_solver import EndgameSolver
+from swd_bot.mcts.game_tree import GameTree
 from swd_bot.mcts.mcts import MCTS
+from swd_bot.mcts.opening_book import OpeningBook
+from swd_bot.mcts.root_parallel import RootParallelMCTS
+from swd_bot.mcts.search_metrics import SearchMetrics
+from swd_bot.mcts.time_manager import TimeManager
+from swd_bot.mcts.transposition_table import TranspositionTable
+
+
+def create_evaluation_function(predictor: Union[PolicyAgent, EvaluationCache]) -> Callable[[GameState], float]:
+    def evaluation_function(s: GameState):
+        _, winners_predictions = predictor.predict(s)
+        winners_predictions = np.exp(winners_predictions)
+        winners_predictions /= winners_predictions.sum()
+        return winners_predictions[s.current_player_index]
+
+    return evaluation_function
+
+
+def create_batch_evaluation_function(predictor: Union[PolicyAgent, EvaluationCache]) \
+        -> Callable[[List[GameState]], np.ndarray]:
+    def batch_evaluation_function(states: List[GameState]) -> np.ndarray:
+        _, winners_predictions = predictor.predict_batch(states)
+        winners_predictions = np.exp(winners_predictions)
+        winners_predictions /= winners_predictions.sum(axis=1, keepdims=True)
+        current_players = [s.current_player_index for s in states]
+        return winners_predictions[np.arange(len(states)), current_players]
+
+    return batch_evaluation_function
+
+
+def create_prior_function(predictor: Union[PolicyAgent, EvaluationCache]) \
+        -> Callable[[GameState, Sequence[Action]], np.ndarray]:
+    def prior_function(s: GameState, actions: Sequence[Action]) -> np.ndarray:
+        # the policy head covers only the card actions of a normal turn
+        if s.game_status != GameStatus.NORMAL_TURN:
+            return np.full(len(actions), 1 / len(actions))
+        actions_predictions, _ = predictor.predict(s)
+        return PolicyAgent.normalize_actions(actions_predictions, actions)
+
+    return prior_function
+
+
+def create_mcts(state: GameState,
+                torch_agent: PolicyAgent,
+                evaluation_cache: Optional[EvaluationCache] = None,
+                information_sets: bool = False,
+                puct: bool = False,
+                simulation_agent: Optional[Agent] = None) -> MCTS:
+    predictor = evaluation_cache if evaluation_cache is not None else torch_agent
+    return MCTS(state,
+                simulation_agent if simulation_agent is not None else RandomAgent(),
+                torch_agent,
+                create_evaluation_function(predictor),
+                lazy_states=True,
+                batch_evaluation_function=create_batch_evaluation_function(predictor),
+                transposition_table=TranspositionTable(),
+                max_bytes=1 << 30,
+                information_sets=information_sets,
+                prior_function=create_prior_function(predictor) if puct else None)
+
+
+def create_policy_agent(numpy_inference: bool = False) -> PolicyAgent:
+    # exported weights skip the torch dispatch overhead of single state predictions
+    if numpy_inference:
+        return NumpyAgent()
+    # torch is imported only by agents that run it
+    from swd_bot.agents.torch_agent import TorchAgent
+    return TorchAgent()
+
+
+def warm_start_mcts(mcts: MCTS, opening_book: Optional[OpeningBook]):
+    if opening_book is None:
+        return
+    root_state = mcts.tree.states[GameTree.ROOT]
+    if Game.is_finished(root_state):
+        return
+    codes, visits, wins = opening_book.lookup(root_state)
+    if len(codes) > 0:
+        mcts.warm_start(codes, visits, wins)
+
+
+# called in every worker process, the options have to be picklable
+def create_mcts_factory(information_sets: bool = False,
+                        puct: bool = False,
+                        rollout_policy_path: Optional[str] = None,
+                        numpy_inference: bool = False,
+                        opening_book_path: Optional[str] = None) -> Callable[[GameState], MCTS]:
+    torch_agent = create_policy_agent(numpy_inference)
+    evaluation_cache = EvaluationCache(torch_agent)
+    rollout_agent = LinearRolloutAgent(rollout_policy_path) if rollout_policy_path is not None else None
+    opening_book = OpeningBook(opening_book_path) if opening_book_path is not None else None
+
+    def mcts_factory(state: GameState) -> MCTS:
+        mcts = create_mcts(state, torch_agent, evaluation_cache, information_sets, puct, rollout_agent)
+        warm_start_mcts(mcts, opening_book)
+        return mcts
+
+    return mcts_factory
 
 
 class MCTSAgent(Agent):
-    mcts: MCTS
+    mcts: Optional[MCTS]
+    root_parallel_mcts: Optional[RootParallelMCTS]
 
-    def __init__(self, state: GameState):
+    def __init__(self,
+                 state: GameState,
+                 workers: int = 1,
+                 ponder: bool = False,
+                 time_bank: Optional[float] = None,
+                 opening_book_path: Optional[str] = None,
+                 endgame_cards: int = 6,
+                 information_sets: bool = False,
+                 puct: bool = False,
+                 rollout_policy_path: Optional[str] = None,
+                 numpy_inference: bool = False):
         super().__init__()
 
-        self.torch_agent = TorchAgent()
+        if workers > 1 and ponder:
+            # worker trees are rebuilt for every move, there is no tree to ponder on
+            raise ValueError("pondering is not supported with root parallel workers")
+
+        self.time_manager = TimeManager(time_bank) if time_bank is not None else None
 
-        def evaluation_function(s: GameState):
-            _, winners_predictions = self.torch_agent.predict(s)
-            winners_predictions = np.exp(winners_predictions)
-            winners_predictions /= winners_predictions.sum()
-            return winners_predictions[s.current_player_index]
+        self.torch_agent = create_policy_agent(numpy_inference)
+        self.evaluation_cache = EvaluationCache(self.torch_agent)
+        self.rollout_agent = LinearRolloutAgent(rollout_policy_path) if rollout_policy_path is not None else None
+        self.ponder = ponder
+        self.ponder_thread: Optional[threading.Thread] = None
+        self.ponder_stop_event = threading.Event()
+        self.opening_book = OpeningBook(opening_book_path) if opening_book_path is not None else None
+        self.endgame_solver = EndgameSolver(endgame_cards)
+        self.last_metrics: Optional[SearchMetrics] = None
 
-        self.mcts = MCTS(state, RandomAgent(), self.torch_agent, evaluation_function)
+        if workers > 1:
+            self.mcts = None
+            self.root_parallel_mcts = RootParallelMCTS(workers, functools.partial(create_mcts_factory,
+                                                                                  information_sets,
+                                                                                  puct,
+                                                                                  rollout_policy_path,
+                                                                                  numpy_inference,
+                                                                                  opening_book_path))
+        else:
+            self.mcts = create_mcts(state.clone() if ponder else state,
+                                    self.torch_agent,
+                                    self.evaluation_cache,
+                                    information_sets,
+                                    puct,
+                                    self.rollout_agent)
+            self.root_parallel_mcts = None
+            self.warm_start()
+            self.start_pondering()
 
     def choose_action(self, state: GameState, possible_actions: Sequence[Action]) -> Action:
+        # the ponder thread shares the predictor, whose single state buffers are not thread safe
+        self.stop_pondering()
+
         if state.game_status == GameStatus.PICK_WONDER:
             return self.torch_agent.choose_action(state, possible_actions)
 
-        self.mcts.run(max_time=10, playout_limit=100, simulations=10_000, playouts=1)
-        self.mcts.print_optimal_path(1)
+        if len(possible_actions) == 1:
+            return possible_actions[0]
+
+        start = time.time()
+        max_time = self.time_manager.move_time(state) if self.time_manager is not None else 10
+        if self.endgame_solver.applies(state):
+            action = self.endgame_solver.solve(state, possible_actions, max_time)
+            if action is not None:
+                if self.time_manager is not None:
+                    self.time_manager.spend(time.time() - start)
+                return action
+            # not even the first iteration finished in time
+            max_time = max(0.0, max_time - (time.time() - start))
+
+        run_parameters = dict(max_time=max_time, playout_limit=100, simulations=10_000, playouts=1, batch_size=8,
+                              early_stop=True)
+        if self.root_parallel_mcts is not None:
+            codes, _, rates, _ = self.root_parallel_mcts.run(state, **run_parameters)
+        else:
+            win_code = self.mcts.proven_win_code()
+            if win_code is None:
+                self.last_metrics = self.mcts.run(**run_parameters)
+                self.mcts.print_optimal_path(1)
+                win_code = self.mcts.proven_win_code()
+            codes, _, rates = self.mcts.root_statistics()
+            if win_code is not None:
+                # a proven win beats any rate
+                rates = np.where(codes == win_code, math.inf, rates)
+        if self.time_manager is not None:
+            self.time_manager.spend(time.time() - start)
 
         # actions_predictions, _ = self.torch_agent.predict(state)
         # if state.game_status == GameStatus.NORMAL_TURN:
@@ -43,15 +217,43 @@ class MCTSAgent(Agent):
         #     actions_probs = np.zeros(len(possible_actions))
         actions_probs = np.zeros(len(possible_actions))
 
+        code_rates = dict(zip(codes.tolist(), rates.tolist()))
         for i, action in enumerate(possible_actions):
-            if str(action) in self.mcts.root.children:
-                child = self.mcts.root.children[str(action)]
-                if self.mcts.root.current_player_index == child.current_player_index:
-                    rate = child.rate()
-                else:
-                    rate = 1 - child.rate()
-                actions_probs[i] += rate
+            actions_probs[i] += code_rates.get(ActionCodec.encode(action), 0)
         return possible_actions[actions_probs.argmax()]
 
     def on_action_applied(self, action: Action, new_state: GameState):
-        self.mcts.shrink_tree(action, new_state)
+        if self.mcts is not None:
+            self.stop_pondering()
+            if self.ponder:
+                # the caller keeps mutating its state while the search thread reads the root
+                new_state = new_state.clone()
+            self.mcts.shrink_tree(action, new_state)
+            self.warm_start()
+            self.start_pondering()
+
+    def warm_start(self):
+        warm_start_mcts(self.mcts, self.opening_book)
+
+    def start_pondering(self):
+        if not self.ponder or self.mcts is None or self.ponder_thread is not None:
+            return
+        if Game.is_finished(self.mcts.tree.states[GameTree.ROOT]):
+            return
+        self.ponder_stop_event.clear()
+        run_parameters = dict(playout_limit=100, simulations=10 ** 9, playouts=1, batch_size=8,
+                              stop_event=self.ponder_stop_event, progress_bar=False)
+        self.ponder_thread = threading.Thread(target=self.mcts.run, kwargs=run_parameters, daemon=True)
+        self.ponder_thread.start()
+
+    def stop_pondering(self):
+        if self.ponder_thread is None:
+            return
+        self.ponder_stop_event.set()
+        self.ponder_thread.join()
+        self.ponder_thread = None
+
+    def close(self):
+        self.stop_pondering()
+        if self.root_parallel_mcts is not None:
+            self.root_parallel_mcts.close()
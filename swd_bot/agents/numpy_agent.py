@@ -0,0 +1,23 @@
+from typing import Sequence, Tuple, Optional
+
+import numpy as np
+from swd.states.game_state import GameState
+
+from swd_bot.agents.policy_agent import PolicyAgent
+from swd_bot.model.model_paths import ModelPaths, DEFAULT_MODEL
+from swd_bot.model.numpy_models import NumpyModel
+
+
+# Policy agent on weights exported by ModelRegistry.export_numpy, runs without importing torch
+class NumpyAgent(PolicyAgent):
+    def __init__(self, model_name: str = DEFAULT_MODEL, path: Optional[str] = None):
+        super().__init__()
+        self.model = NumpyModel.load(path if path is not None else ModelPaths.numpy_path(model_name))
+
+    def predict(self, state: GameState) -> Tuple[np.ndarray, np.ndarray]:
+        features, _ = self.feature_extractor.features(state)
+        return self.model.predict(features)
+
+    def predict_batch(self, states: Sequence[GameState]) -> Tuple[np.ndarray, np.ndarray]:
+        features = np.array([self.feature_extractor.features(state)[0] for state in states], dtype=np.float32)
+        return self.model.predict_batch(features)
@@ -0,0 +1,93 @@
+import random
+from abc import ABC, abstractmethod
+from typing import Sequence, Tuple, List, Optional
+
+import numpy as np
+from swd.action import Action, BuyCardAction
+from swd.agents import Agent
+from swd.bonuses import INSTANT_BONUSES
+from swd.entity_manager import EntityManager
+from swd.states.game_state import GameState, GameStatus
+
+from swd_bot.action_codec import ActionCodec, POLICY_INDICES
+from swd_bot.agents.rule_based_agent import RuleBasedAgent
+from swd_bot.data_providers.feature_extractor import ManualFeatureExtractor
+
+
+# Agent playing by a policy/value model over manual features, the inference backend is up to subclasses
+class PolicyAgent(Agent, ABC):
+    def __init__(self):
+        self.feature_extractor = ManualFeatureExtractor()
+
+        self.rule_based_agent = RuleBasedAgent()
+
+    @abstractmethod
+    def predict(self, state: GameState) -> Tuple[np.ndarray, np.ndarray]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def predict_batch(self, states: Sequence[GameState]) -> Tuple[np.ndarray, np.ndarray]:
+        raise NotImplementedError
+
+    @staticmethod
+    def normalize_actions(action_predictions: np.ndarray, possible_actions: Sequence[Action]) -> np.ndarray:
+        return PolicyAgent.normalize_actions_batch(action_predictions[None], [possible_actions])[0]
+
+    @staticmethod
+    def normalize_actions_batch(actions_predictions: np.ndarray,
+                                actions_lists: Sequence[Sequence[Action]]) -> List[np.ndarray]:
+        counts = np.fromiter(map(len, actions_lists), dtype=np.int64, count=len(actions_lists))
+        codes = np.fromiter((ActionCodec.encode(action) for actions in actions_lists for action in actions),
+                            dtype=np.int64, count=counts.sum())
+        indices = POLICY_INDICES[codes]
+        if (indices < 0).any():
+            raise ValueError
+        rows = np.repeat(np.arange(len(actions_lists)), counts)
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        # the max logit of every state is subtracted, so float32 logits can't overflow
+        logits = actions_predictions[rows, indices].astype(np.float64)
+        actions_probs = np.exp(logits - np.repeat(np.maximum.reduceat(logits, starts), counts))
+        actions_probs /= np.repeat(np.add.reduceat(actions_probs, starts), counts)
+
+        return np.split(actions_probs, starts[1:])
+
+    def forced_action(self, state: GameState, possible_actions: Sequence[Action]) -> Optional[Action]:
+        if state.game_status != GameStatus.NORMAL_TURN:
+            return self.rule_based_agent.choose_action(state, possible_actions)
+
+        if abs(state.military_track_state.conflict_pawn) >= 6:
+            for action in possible_actions:
+                if isinstance(action, BuyCardAction):
+                    if INSTANT_BONUSES.index("shield") in EntityManager.card(action.card_id).instant_bonuses:
+                        return action
+
+        return None
+
+    @staticmethod
+    def sample_action(possible_actions: Sequence[Action], actions_probs: np.ndarray) -> Action:
+        # return possible_actions[actions_probs.argmax()]
+
+        actions_probs = np.power(actions_probs, 2)
+        actions_probs /= actions_probs.sum()
+        return random.choices(possible_actions, weights=actions_probs)[0]
+
+    def choose_action(self, state: GameState, possible_actions: Sequence[Action]) -> Action:
+        action = self.forced_action(state, possible_actions)
+        if action is not None:
+            return action
+
+        actions_predictions, _ = self.predict(state)
+        actions_probs = PolicyAgent.normalize_actions(actions_predictions, possible_actions)
+        return PolicyAgent.sample_action(possible_actions, actions_probs)
+
+    def choose_actions(self, states: Sequence[GameState], actions_lists: Sequence[Sequence[Action]]) -> List[Action]:
+        selected_actions = [self.forced_action(state, actions) for state, actions in zip(states, actions_lists)]
+        # the remaining states share one forward pass
+        predicted = [i for i, action in enumerate(selected_actions) if action is None]
+        if len(predicted) > 0:
+            actions_predictions, _ = self.predict_batch([states[i] for i in predicted])
+            actions_probs = PolicyAgent.normalize_actions_batch(actions_predictions,
+                                                                [actions_lists[i] for i in predicted])
+            for i, probs in zip(predicted, actions_probs):
+                selected_actions[i] = PolicyAgent.sample_action(actions_lists[i], probs)
+        return selected_actions
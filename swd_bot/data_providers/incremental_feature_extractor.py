@@ -0,0 +1,130 @@
+from typing import Tuple, Optional, Dict, Any, List
+
+import numpy as np
+from swd.action import Action
+from swd.game import Game
+from swd.player import Player
+from swd.states.game_state import GameState
+
+from swd_bot.data_providers.feature_extractor import FeatureExtractor
+from swd_bot.state_features import StateFeatures
+
+# the guilds are the last cards, they are the only ones scoring by the opponent city
+FIRST_GUILD_ID = 66
+
+
+# Manual features of one tracked state, after every change only the slots whose inputs differ are recomputed.
+# Any other state goes through the full recompute.
+class IncrementalFeatureExtractor(FeatureExtractor):
+    state: Optional[GameState]
+
+    def __init__(self, state: Optional[GameState] = None):
+        self.state = None
+        self.buffer = np.zeros(0)
+        self.slots: Dict[Any, slice] = {}
+        self.snapshot: Dict[Any, Any] = {}
+        if state is not None:
+            self.reset(state)
+
+    def features(self, state: GameState) -> Tuple[np.ndarray, np.ndarray]:
+        if state is self.state:
+            self.update()
+        else:
+            self.reset(state)
+        return self.buffer.copy(), np.array([])
+
+    def apply_action(self, action: Action):
+        Game.apply_action(self.state, action)
+        self.update()
+
+    def clone(self) -> "IncrementalFeatureExtractor":
+        extractor = IncrementalFeatureExtractor()
+        extractor.state = self.state.clone()
+        extractor.buffer = self.buffer.copy()
+        extractor.slots = self.slots
+        extractor.snapshot = dict(self.snapshot)
+        return extractor
+
+    def reset(self, state: GameState):
+        self.state = state
+        parts: List[Tuple[Any, List[int]]] = [
+            ("age", StateFeatures.manual_age_features(state)),
+            ("tokens", StateFeatures.manual_tokens_features(state)),
+        ]
+        for i, player_state in enumerate(state.players_state):
+            parts.extend([
+                (("coins", i), [player_state.coins]),
+                (("points", i), StateFeatures.manual_points_features(state, i)),
+                (("wonders", i), StateFeatures.manual_wonders_features(state, i)),
+                (("assets", i), StateFeatures.manual_assets_features(state, i)),
+                (("science", i), StateFeatures.manual_science_features(state, i)),
+            ])
+        parts.append(("pawn", [state.military_track_state.conflict_pawn]))
+        parts.append(("board", StateFeatures.manual_board_features(state)))
+
+        # the same order as StateFeatures.extract_manual_state_features
+        offset = 0
+        self.slots = {}
+        for key, values in parts:
+            self.slots[key] = slice(offset, offset + len(values))
+            offset += len(values)
+        self.buffer = np.array([value for _, values in parts for value in values])
+        self.snapshot = IncrementalFeatureExtractor.take_snapshot(state)
+
+    def update(self):
+        state = self.state
+        snapshot = IncrementalFeatureExtractor.take_snapshot(state)
+        changed = {key for key, value in snapshot.items() if self.snapshot[key] != value}
+        if len(changed) == 0:
+            return
+        self.snapshot = snapshot
+
+        if "age" in changed:
+            self.buffer[self.slots["age"]] = StateFeatures.manual_age_features(state)
+        if "tokens" in changed:
+            self.buffer[self.slots["tokens"]] = StateFeatures.manual_tokens_features(state)
+        if "pawn" in changed:
+            self.buffer[self.slots["pawn"]] = state.military_track_state.conflict_pawn
+        if "board" in changed or "age" in changed:
+            self.buffer[self.slots["board"]] = StateFeatures.manual_board_features(state)
+
+        for i, player_state in enumerate(state.players_state):
+            opponent = 1 - i
+            if ("coins", i) in changed:
+                self.buffer[self.slots[("coins", i)]] = player_state.coins
+            # coins score by sets of 3 (treasure and the moneylenders guild), only guilds count the opponent city,
+            # so a trade or a discard that does not complete a set keeps the points
+            points_dependencies = {"pawn", "military_tokens", ("cards", i), ("wonders", i), ("player_tokens", i),
+                                   ("bonuses", i), ("treasure", i)}
+            if any(card_id >= FIRST_GUILD_ID for card_id in player_state.cards):
+                points_dependencies |= {("cards", opponent), ("bonuses", opponent), ("treasure", opponent)}
+            if len(changed & points_dependencies) > 0:
+                self.buffer[self.slots[("points", i)]] = StateFeatures.manual_points_features(state, i)
+            # theology makes every wonder a double turn one
+            if ("wonders", i) in changed or ("bonuses", i) in changed:
+                self.buffer[self.slots[("wonders", i)]] = StateFeatures.manual_wonders_features(state, i)
+            if ("bonuses", i) in changed:
+                self.buffer[self.slots[("science", i)]] = StateFeatures.manual_science_features(state, i)
+            # trading prices depend only on the resources of the opponent
+            if len(changed & {("wonders", i), ("player_tokens", i), ("bonuses", i), ("resources", opponent)}) > 0:
+                self.buffer[self.slots[("assets", i)]] = StateFeatures.manual_assets_features(state, i)
+
+    @staticmethod
+    def take_snapshot(state: GameState) -> Dict[Any, Any]:
+        snapshot = {
+            "age": state.age,
+            "tokens": tuple(state.progress_tokens),
+            "pawn": state.military_track_state.conflict_pawn,
+            "military_tokens": tuple(state.military_track_state.military_tokens),
+            "board": state.cards_board_state.card_places.tobytes(),
+        }
+        for i, player_state in enumerate(state.players_state):
+            snapshot[("coins", i)] = player_state.coins
+            snapshot[("treasure", i)] = player_state.coins // 3
+            # everything a player builds or takes shows up in the cards, wonders, tokens or bonuses
+            snapshot[("cards", i)] = len(player_state.cards)
+            snapshot[("wonders", i)] = tuple(x[1] is None for x in player_state.wonders)
+            snapshot[("player_tokens", i)] = tuple(player_state.progress_tokens)
+            snapshot[("bonuses", i)] = player_state.bonuses.tobytes()
+            snapshot[("resources", i)] = np.asarray(Player.resources(player_state)).tobytes()
+        return snapshot
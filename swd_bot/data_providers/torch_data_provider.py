@@ -2,9 +2,9 @@ import pickle
 
 import torch
 from omegaconf import DictConfig
-from swd.entity_manager import EntityManager
 from torch.utils.data import Dataset, DataLoader
 
+from swd_bot.action_codec import ActionCodec
 from swd_bot.data_providers.feature_extractor import FeatureExtractor
 
 
@@ -25,13 +25,8 @@ class TorchDataset(Dataset):
         features, cards = self.feature_extractor.features(state)
         features = torch.tensor(features, dtype=torch.float)
         cards = torch.tensor(cards, dtype=torch.float)
-        if str(action)[:3] == "Buy":
-            action_id = action.card_id
-        elif str(action)[:3] == "Dis":
-            action_id = action.card_id + EntityManager.cards_count()
-        elif str(action)[:3] == "Bui":
-            action_id = action.wonder_id + 2 * EntityManager.cards_count()
-        else:
+        action_id = ActionCodec.policy_index(ActionCodec.encode(action))
+        if action_id < 0:
             raise ValueError
         winner = state.meta_info["result"].get("winnerIndex", 0)
         return (features, cards), (torch.tensor(action_id, dtype=torch.long), torch.tensor(winner, dtype=torch.long))
@@ -8,13 +8,17 @@ import torch
 from swd.action import BuyCardAction, DiscardCardAction, BuildWonderAction
 from swd.agents import Agent, RecordedAgent, ConsoleAgent, RandomAgent
 from swd.game import Game
-from swd.states.game_state import GameState
+from swd.states.game_state import GameState, GameStatus
 from tqdm import tqdm
 
-from swd_bot.agents.mcts_agent import MCTSAgent
+from swd_bot.action_codec import ActionCodec
+from swd_bot.agents.mcts_agent import MCTSAgent, create_mcts_factory, create_mcts
 from swd_bot.agents.torch_agent import TorchAgent
 from swd_bot.data_providers.feature_extractor import FlattenEmbeddingsFeatureExtractor
 from swd_bot.game_features import GameFeatures
+from swd_bot.mcts.game_tree import GameTree
+from swd_bot.mcts.opening_book import OpeningBook
+from swd_bot.mcts.root_parallel import RootParallelMCTS
 from swd_bot.model.torch_models import TorchBaseline
 from swd_bot.test.correctness import test_games_correctness, test_game_correctness
 from swd_bot.thirdparty.sevenee import SeveneeLoader
@@ -73,18 +77,48 @@ def estimate(state: GameState, agent: MCTSAgent) -> float:
     actions = Game.get_available_actions(state)
     agent.choose_action(state, actions)
     best_rate = None
-    for action, child in agent.mcts.root.children.items():
-        if action not in map(str, actions):
+    tree = agent.mcts.tree
+    for action in actions:
+        child = tree.find_child(GameTree.ROOT, ActionCodec.encode(action))
+        if child < 0:
             continue
-        if agent.mcts.root.current_player_index == child.current_player_index:
-            rate = child.rate()
-        else:
-            rate = 1 - child.rate()
+        rate = agent.mcts.child_rate(GameTree.ROOT, child)
         if best_rate is None or best_rate < rate:
             best_rate = rate
     return best_rate if state.current_player_index == 1 else 1 - best_rate
 
 
+def benchmark_root_parallel(max_time: int = 10):
+    state = Game.create()
+    agent = RandomAgent()
+    while state.game_status == GameStatus.PICK_WONDER:
+        actions = Game.get_available_actions(state)
+        Game.apply_action(state, agent.choose_action(state, actions))
+
+    base_speed = None
+    for workers in [1, 2, 4, 8, 16, 32]:
+        parallel_mcts = RootParallelMCTS(workers, create_mcts_factory)
+        _, _, _, simulations = parallel_mcts.run(state, max_time=max_time, playout_limit=100)
+        parallel_mcts.close()
+        speed = simulations / max_time
+        if base_speed is None:
+            base_speed = speed
+        print(f"{workers} workers: {speed:.1f} simulations/sec, scaling {speed / base_speed:.2f}")
+
+
+def build_opening_book(path: str, games: int = 100, max_time: int = 600, plies: int = 4, min_visits: int = 100):
+    entries = []
+    for _ in tqdm(range(games)):
+        state = Game.create()
+        while state.game_status == GameStatus.PICK_WONDER:
+            actions = Game.get_available_actions(state)
+            Game.apply_action(state, torch_agent.choose_action(state, actions))
+        mcts = create_mcts(state, torch_agent)
+        mcts.run(max_time=max_time, playout_limit=100, batch_size=8)
+        entries.append(OpeningBook.tree_entries(mcts.tree, plies, min_visits))
+    OpeningBook.save(path, entries)
+
+
 def collect_states_actions():
     saved_states = [[], [], []]
     saved_actions = [[], [], []]
@@ -228,6 +262,10 @@ def main():
 
     # test_games_correctness("../../7wd/sevenee/", SeveneeLoader)
 
+    # benchmark_root_parallel()
+
+    # build_opening_book("../models/opening_book.npy")
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,55 @@
+from typing import List, Callable
+
+import numpy as np
+from swd.agents import Agent, RandomAgent
+from swd.game import Game
+from swd.states.game_state import GameState
+
+
+# Advances many playouts in lockstep, one move of every unfinished playout per step
+class BatchRollout:
+    def __init__(self, simulation_agent: Agent):
+        self.simulation_agent = simulation_agent
+        # random moves of the whole batch are drawn with a single call instead of an agent call per move
+        self.random_moves = type(simulation_agent) is RandomAgent
+        # agents with choose_actions pick the moves of the whole batch in one call
+        self.batched_moves = hasattr(simulation_agent, "choose_actions")
+
+    def play(self, states: List[GameState], playout_limit: int) -> List[GameState]:
+        states = [state.clone() for state in states]
+        moves_count = np.zeros(len(states), dtype=np.int32)
+        active = np.array([not Game.is_finished(state) for state in states], dtype=bool) & (playout_limit > 0)
+        while active.any():
+            indices = np.flatnonzero(active)
+            actions_lists = [Game.get_available_actions(states[i]) for i in indices.tolist()]
+            if self.random_moves:
+                counts = np.array([len(actions) for actions in actions_lists])
+                choices = (np.random.random(len(indices)) * counts).astype(np.int64).tolist()
+                selected_actions = [actions[choice] for actions, choice in zip(actions_lists, choices)]
+            elif self.batched_moves:
+                selected_actions = self.simulation_agent.choose_actions([states[i] for i in indices.tolist()],
+                                                                        actions_lists)
+            else:
+                selected_actions = [self.simulation_agent.choose_action(states[i], actions)
+                                    for i, actions in zip(indices.tolist(), actions_lists)]
+            for i, action in zip(indices.tolist(), selected_actions):
+                Game.apply_action(states[i], action)
+            moves_count[indices] += 1
+            finished = np.array([Game.is_finished(states[i]) for i in indices.tolist()], dtype=bool)
+            active[indices] = ~finished & (moves_count[indices] < playout_limit)
+        return states
+
+    @staticmethod
+    def results(players: np.ndarray,
+                states: List[GameState],
+                evaluate_batch: Callable[[List[GameState]], np.ndarray]) -> np.ndarray:
+        finished = np.array([Game.is_finished(state) for state in states], dtype=bool)
+        winners = np.array([state.winner if is_finished else -1 for state, is_finished in zip(states, finished)])
+        current_players = np.array([state.current_player_index for state in states])
+
+        values = np.zeros(len(states))
+        truncated = np.flatnonzero(~finished)
+        values[truncated] = evaluate_batch([states[i] for i in truncated.tolist()])
+        # the evaluation is made for the player to move at the end of the playout
+        values = np.where(current_players == players, values, 1 - values)
+        return np.where(finished, winners == players, values).astype(np.float64)
@@ -0,0 +1,133 @@
+import math
+import time
+from typing import Tuple, Dict, Sequence, Optional
+
+import numpy as np
+from swd.action import Action
+from swd.cards_board import NO_CARD
+from swd.game import Game
+from swd.states.game_state import GameState
+
+from swd_bot.action_codec import ActionCodec
+from swd_bot.mcts.mcts import MCTS
+from swd_bot.state_hash import StateHash
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+# Iterative deepening alpha-beta over the engine for the last cards of Age III, scored by points difference
+class EndgameSolver:
+    WIN_SCORE = 1000
+    # transposition table bounds
+    EXACT = 0
+    LOWER = 1
+    UPPER = 2
+
+    table: Dict[int, Tuple[float, float, int, int]]
+
+    def __init__(self, max_cards: int = 6):
+        self.max_cards = max_cards
+        self.player = 0
+        self.deadline = math.inf
+        self.table = {}
+
+    def applies(self, state: GameState) -> bool:
+        # closed cards are revealed at random, the search is exact only when everything left is open
+        if state.age != 2 or MCTS.closed_cards_count(state) > 0:
+            return False
+        return np.count_nonzero(np.asarray(state.cards_board_state.card_places) != NO_CARD) <= self.max_cards
+
+    def solve(self, state: GameState, possible_actions: Sequence[Action], max_time: float) -> Optional[Action]:
+        self.player = state.current_player_index
+        self.deadline = time.time() + max_time
+        self.table = {}
+        key = StateHash.hash(state)
+        best_code = -1
+        depth = 1
+        while True:
+            try:
+                _, code, complete = self.search(state, key, depth, -math.inf, math.inf)
+            except SearchTimeout:
+                break
+            best_code = code
+            if complete:
+                break
+            depth += 1
+
+        for action in possible_actions:
+            if ActionCodec.encode(action) == best_code:
+                return action
+        return None
+
+    def search(self, state: GameState, key: int, depth: int, alpha: float, beta: float) -> Tuple[float, int, bool]:
+        if time.time() > self.deadline:
+            raise SearchTimeout
+        if Game.is_finished(state):
+            return self.terminal_score(state), -1, True
+        if depth == 0:
+            return self.points_difference(state), -1, False
+
+        table_code = -1
+        entry = self.table.get(key)
+        if entry is not None:
+            entry_depth, entry_score, bound, table_code = entry
+            if entry_depth >= depth:
+                complete = entry_depth == math.inf
+                if bound == self.EXACT:
+                    return entry_score, table_code, complete
+                if bound == self.LOWER:
+                    alpha = max(alpha, entry_score)
+                else:
+                    beta = min(beta, entry_score)
+                if alpha >= beta:
+                    return entry_score, table_code, complete
+
+        actions = Game.get_available_actions(state)
+        codes = [ActionCodec.encode(action) for action in actions]
+        # the best move of a shallower search goes first
+        order = sorted(range(len(actions)), key=lambda i: codes[i] != table_code)
+
+        maximizing = state.current_player_index == self.player
+        original_alpha, original_beta = alpha, beta
+        best_score = -math.inf if maximizing else math.inf
+        best_code = -1
+        complete = True
+        for i in order:
+            child = state.clone()
+            Game.apply_action(child, actions[i])
+            child_key = StateHash.hash(child)
+            score, _, child_complete = self.search(child, child_key, depth - 1, alpha, beta)
+            complete = complete and child_complete
+            if maximizing:
+                if score > best_score:
+                    best_score, best_code = score, codes[i]
+                alpha = max(alpha, score)
+            else:
+                if score < best_score:
+                    best_score, best_code = score, codes[i]
+                beta = min(beta, score)
+            if alpha >= beta:
+                break
+
+        if best_score <= original_alpha:
+            bound = self.UPPER
+        elif best_score >= original_beta:
+            bound = self.LOWER
+        else:
+            bound = self.EXACT
+        self.table[key] = (math.inf if complete else depth, best_score, bound, best_code)
+        return best_score, best_code, complete
+
+    def points_difference(self, state: GameState) -> float:
+        # points are reported per category
+        return sum(Game.points(state, self.player)) - sum(Game.points(state, 1 - self.player))
+
+    def terminal_score(self, state: GameState) -> float:
+        score = self.points_difference(state)
+        if state.winner == self.player:
+            return score + self.WIN_SCORE
+        if state.winner == 1 - self.player:
+            return score - self.WIN_SCORE
+        return score
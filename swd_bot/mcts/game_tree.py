@@ -0,0 +1,331 @@
+from typing import List, Optional, Dict
+
+import numpy as np
+from swd.action import Action
+from swd.states.game_state import GameState
+
+from swd_bot.action_codec import ActionCodec
+
+
+# Struct-of-arrays search tree: nodes are integer ids, the children of a node are a contiguous block of child_ids
+class GameTree:
+    ROOT = 0
+    CHUNK_SIZE = 1 << 16
+    # children block of a node whose actions count is unknown yet, e.g. the sampled outcomes of a chance node
+    MIN_BLOCK = 4
+    # game theoretic values of solved nodes, for the player of the node
+    UNKNOWN = 0
+    WIN = 1
+    LOSS = 2
+    DRAW = 3
+    OPPONENT_OUTCOMES = np.array([UNKNOWN, LOSS, WIN, DRAW], dtype=np.int8)
+    # array name -> (dtype, value of an empty node)
+    NODE_ARRAYS = {
+        "wins": (np.float64, 0),
+        "visits": (np.int64, 0),
+        # wins / visits, raised by the best discarded card pick of the node
+        "rate": (np.float64, 0),
+        "parent": (np.int32, -1),
+        # offset of the node's children block in child_ids
+        "first_child": (np.int32, -1),
+        "children_count": (np.int32, 0),
+        "children_capacity": (np.int32, 0),
+        "actions_count": (np.int32, -1),
+        "action": (np.int32, -1),
+        "player": (np.int8, 0),
+        "hash": (np.uint64, 0),
+        "has_discard_children": (np.bool_, False),
+        # the node's action has a random result, its children are sampled outcomes keeping their states
+        "chance": (np.bool_, False),
+        "proven": (np.int8, 0),
+        # information set search: how many times the node's action was legal when its parent was passed
+        "availability": (np.int64, 0),
+        # policy probability of the node's action, used by PUCT selection
+        "prior": (np.float32, 0),
+    }
+    SAVED_ARRAYS = ("wins", "visits", "rate", "parent", "actions_count", "action", "player", "hash",
+                    "has_discard_children", "chance", "proven", "availability", "prior")
+    # rough in-memory size of a cached action, the actions lists are only kept in the eager mode
+    ACTION_BYTES = 100
+
+    size: int
+    capacity: int
+    wins: np.ndarray
+    visits: np.ndarray
+    rate: np.ndarray
+    parent: np.ndarray
+    first_child: np.ndarray
+    children_count: np.ndarray
+    children_capacity: np.ndarray
+    actions_count: np.ndarray
+    action: np.ndarray
+    player: np.ndarray
+    hash: np.ndarray
+    has_discard_children: np.ndarray
+    chance: np.ndarray
+    proven: np.ndarray
+    availability: np.ndarray
+    prior: np.ndarray
+    # children blocks, blocks outgrown by their node stay unused until the next compaction
+    child_ids: np.ndarray
+    child_ids_size: int
+    states: List[Optional[GameState]]
+    actions: List[Optional[List[Action]]]
+    # kept states and cached actions, counted as they change so the memory check doesn't scan the lists
+    stored_states: int
+    stored_actions: int
+    # priors of the actions list, kept in PUCT search until every action is expanded
+    priors: List[Optional[np.ndarray]]
+
+    def __init__(self, capacity: int = CHUNK_SIZE):
+        self.size = 0
+        self.capacity = 0
+        for name, (dtype, _) in self.NODE_ARRAYS.items():
+            setattr(self, name, np.zeros(0, dtype=dtype))
+        self.child_ids = np.full(capacity, -1, dtype=np.int32)
+        self.child_ids_size = 0
+        self.states = []
+        self.actions = []
+        self.priors = []
+        self.stored_states = 0
+        self.stored_actions = 0
+        self.grow(capacity)
+
+    def grow(self, count: int = CHUNK_SIZE):
+        self.capacity += count
+        for name, (dtype, value) in self.NODE_ARRAYS.items():
+            setattr(self, name, np.concatenate([getattr(self, name), np.full(count, value, dtype=dtype)]))
+
+    def add_node(self,
+                 parent: int,
+                 action_code: int,
+                 player: int,
+                 state: Optional[GameState],
+                 state_hash: int = 0) -> int:
+        if self.size == self.capacity:
+            self.grow()
+        # slots past size always hold the empty node values, grow and compact fill them
+        node = self.size
+        self.size += 1
+        self.parent[node] = parent
+        self.action[node] = action_code
+        self.player[node] = player
+        self.hash[node] = state_hash
+        self.states.append(state)
+        self.stored_states += state is not None
+        self.actions.append(None)
+        self.priors.append(None)
+        if parent >= 0:
+            count = self.children_count[parent]
+            if count == self.children_capacity[parent]:
+                self.allocate_children(parent, max(2 * count, self.MIN_BLOCK))
+            self.child_ids[self.first_child[parent] + count] = node
+            self.children_count[parent] += 1
+            if ActionCodec.is_pick_discarded_card(action_code):
+                self.has_discard_children[parent] = True
+        return node
+
+    def allocate_children(self, node: int, capacity: int):
+        # a new block at the end of child_ids, the existing children are moved into it
+        if self.child_ids_size + capacity > len(self.child_ids):
+            extra = max(capacity, self.CHUNK_SIZE)
+            self.child_ids = np.concatenate([self.child_ids, np.full(extra, -1, dtype=np.int32)])
+        start = self.child_ids_size
+        count = self.children_count[node]
+        if count > 0:
+            self.child_ids[start:start + count] = self.children(node)
+        self.first_child[node] = start
+        self.children_capacity[node] = capacity
+        self.child_ids_size += capacity
+
+    def set_actions(self, node: int, actions: List[Action], keep_list: bool, priors: Optional[np.ndarray] = None):
+        self.actions_count[node] = len(actions)
+        if self.actions[node] is not None:
+            self.stored_actions -= len(self.actions[node])
+        self.actions[node] = actions if keep_list else None
+        self.stored_actions += len(actions) if keep_list else 0
+        self.priors[node] = priors if keep_list else None
+        if self.children_capacity[node] < len(actions):
+            self.allocate_children(node, len(actions))
+
+    def is_expanded(self, node: int) -> bool:
+        return 0 <= self.actions_count[node] <= self.children_count[node]
+
+    # a view into child_ids, valid until the next node is added
+    def children(self, node: int) -> np.ndarray:
+        start = self.first_child[node]
+        return self.child_ids[start:start + self.children_count[node]]
+
+    def children_of(self, nodes: np.ndarray) -> np.ndarray:
+        # children of all nodes concatenated in the nodes order
+        counts = self.children_count[nodes]
+        offsets = np.repeat(self.first_child[nodes] - np.cumsum(counts) + counts, counts)
+        return self.child_ids[offsets + np.arange(counts.sum())]
+
+    def children_by_code(self, node: int) -> Dict[int, int]:
+        children = self.children(node)
+        return dict(zip(self.action[children].tolist(), children.tolist()))
+
+    def find_child(self, node: int, action_code: int) -> int:
+        children = self.children(node)
+        found = np.flatnonzero(self.action[children] == action_code)
+        return int(children[found[0]]) if len(found) > 0 else -1
+
+    def detach(self, node: int):
+        parent = self.parent[node]
+        if parent < 0:
+            return
+        children = self.children(parent)
+        rest = children[children != node]
+        children[:len(rest)] = rest
+        children[len(rest):] = -1
+        self.children_count[parent] = len(rest)
+        self.parent[node] = -1
+
+    def set_state(self, node: int, state: Optional[GameState]):
+        self.stored_states += (state is not None) - (self.states[node] is not None)
+        self.states[node] = state
+
+    def count_stored(self):
+        self.stored_states = sum(state is not None for state in self.states)
+        self.stored_actions = sum(len(actions) for actions in self.actions if actions is not None)
+
+    def memory_footprint(self, state_bytes: int) -> int:
+        arrays_bytes = sum(getattr(self, name).nbytes for name in self.NODE_ARRAYS) + self.child_ids.nbytes
+        return arrays_bytes + self.stored_states * state_bytes + self.stored_actions * self.ACTION_BYTES
+
+    def drop_states(self, max_states: int):
+        # least visited first, the root and sampled outcomes keep their states
+        candidates = [node for node, state in enumerate(self.states)
+                      if state is not None and node != self.ROOT and not self.chance[self.parent[node]]]
+        candidates.sort(key=lambda x: self.visits[x])
+        drop_count = self.stored_states - max_states
+        for node in candidates[:max(drop_count, 0)]:
+            self.set_state(node, None)
+            if self.actions[node] is not None:
+                self.stored_actions -= len(self.actions[node])
+            self.actions[node] = None
+            self.priors[node] = None
+
+    def prune(self, max_nodes: int):
+        # subtrees below the visits threshold are dropped, their stats are already aggregated in the parents
+        if self.size <= max_nodes:
+            return
+        threshold = np.sort(self.visits[:self.size])[::-1][max_nodes - 1] + 1
+        keep = self.visits[:self.size] >= threshold
+        keep[self.ROOT] = True
+        self.compact(np.flatnonzero(keep).astype(np.int32))
+
+    def solve(self, node: int) -> int:
+        children = self.children(node)
+        if len(children) == 0:
+            return int(self.proven[node])
+        # chance nodes are never solved, their sampled outcomes don't cover every possible reveal
+        outcomes = np.where(self.chance[children], self.UNKNOWN, self.proven[children])
+        outcomes = np.where(self.player[children] == self.player[node], outcomes, self.OPPONENT_OUTCOMES[outcomes])
+        if (outcomes == self.WIN).any():
+            return self.WIN
+        if not self.is_expanded(node) or (outcomes == self.UNKNOWN).any():
+            return self.UNKNOWN
+        return self.DRAW if (outcomes == self.DRAW).any() else self.LOSS
+
+    def update_rates(self, path: np.ndarray):
+        self.rate[path] = self.wins[path] / np.maximum(self.visits[path], 1)
+        for node in path[self.has_discard_children[path]].tolist():
+            self.update_discard_rate(node)
+
+    def update_discard_rate(self, node: int):
+        children = self.children(node)
+        children = children[[ActionCodec.is_pick_discarded_card(code) for code in self.action[children].tolist()]]
+        if len(children) == 0:
+            return
+        rates = np.where(self.player[children] == self.player[node], self.rate[children], 1 - self.rate[children])
+        self.rate[node] = max(self.rate[node], rates.max())
+
+    def path_to_root(self, node: int) -> np.ndarray:
+        path = []
+        while node >= 0:
+            path.append(node)
+            node = self.parent[node]
+        return np.array(path, dtype=np.int32)
+
+    def subtree(self, node: int, max_depth: Optional[int] = None, stop_at_chance: bool = False) -> np.ndarray:
+        # breadth-first, so every parent goes before its children
+        levels = [np.array([node], dtype=np.int32)]
+        depth = 0
+        while len(levels[-1]) > 0 and (max_depth is None or depth < max_depth):
+            frontier = levels[-1]
+            if stop_at_chance and depth > 0:
+                frontier = frontier[~self.chance[frontier]]
+            levels.append(self.children_of(frontier))
+            depth += 1
+        return np.concatenate(levels)
+
+    def reroot(self, node: int, max_depth: Optional[int] = None):
+        order = self.subtree(node, max_depth)
+        self.detach(node)
+        self.compact(order)
+
+    def compact(self, ids: np.ndarray):
+        # ids[0] becomes the new root, every other kept node must have its parent kept
+        remap = np.full(self.size + 1, -1, dtype=np.int32)
+        remap[ids] = np.arange(len(ids), dtype=np.int32)
+
+        for name in self.NODE_ARRAYS:
+            setattr(self, name, getattr(self, name)[ids])
+        self.parent = remap[self.parent]
+        self.parent[0] = -1
+        self.size = len(ids)
+        self.capacity = len(ids)
+        self.relink()
+
+        self.states = [self.states[i] for i in ids]
+        self.actions = [self.actions[i] for i in ids]
+        self.priors = [self.priors[i] for i in ids]
+        self.count_stored()
+        self.grow()
+
+    def relink(self):
+        # children blocks are laid out in parent order, children in id order, with room for the unexpanded actions
+        size = self.size
+        nodes = np.argsort(self.parent[1:size], kind="stable").astype(np.int32) + 1
+        parents = self.parent[nodes]
+        counts = np.bincount(parents, minlength=size).astype(np.int32)
+        capacities = np.maximum(counts, self.actions_count[:size])
+        starts = (np.cumsum(capacities) - capacities).astype(np.int32)
+        ranks = np.arange(len(nodes)) - (np.cumsum(counts) - counts)[parents]
+
+        self.child_ids = np.full(int(capacities.sum()) + self.CHUNK_SIZE, -1, dtype=np.int32)
+        self.child_ids[starts[parents] + ranks] = nodes
+        self.child_ids_size = int(capacities.sum())
+        self.first_child[:] = -1
+        self.children_count[:] = 0
+        self.children_capacity[:] = 0
+        self.first_child[:size] = np.where(capacities > 0, starts, -1)
+        self.children_count[:size] = counts
+        self.children_capacity[:size] = capacities
+
+    def save(self, path: str, max_depth: Optional[int] = None):
+        # states are not saved, so the subtrees below chance nodes can't be replayed and are cut off
+        ids = self.subtree(self.ROOT, max_depth, stop_at_chance=True)
+        remap = np.full(self.size + 1, -1, dtype=np.int32)
+        remap[ids] = np.arange(len(ids), dtype=np.int32)
+        arrays = {name: getattr(self, name)[ids] for name in self.SAVED_ARRAYS}
+        arrays["parent"] = remap[arrays["parent"]]
+        arrays["parent"][0] = -1
+        np.savez_compressed(path, **arrays)
+
+    @staticmethod
+    def load(path: str, root_state: GameState) -> "GameTree":
+        with np.load(path) as data:
+            size = len(data["parent"])
+            tree = GameTree(size)
+            for name in GameTree.SAVED_ARRAYS:
+                getattr(tree, name)[:size] = data[name]
+        tree.size = size
+        tree.relink()
+        tree.states = [root_state] + [None] * (size - 1)
+        tree.actions = [None] * size
+        tree.priors = [None] * size
+        tree.count_stored()
+        return tree
@@ -1,6 +1,9 @@
 import math
+import pickle
+import random
+import threading
 import time
-from typing import Tuple, Callable
+from typing import Tuple, Callable, Optional, List
 
 import numpy as np
 from swd.action import Action
@@ -10,21 +13,55 @@ from swd.game import Game
 from swd.states.game_state import GameState
 from tqdm import tqdm
 
-from swd_bot.mcts.game_tree_node import GameTreeNode
+from swd_bot.action_codec import ActionCodec
+from swd_bot.mcts.batch_rollout import BatchRollout
+from swd_bot.mcts.game_tree import GameTree
+from swd_bot.mcts.search_metrics import SearchMetrics
+from swd_bot.mcts.transposition_table import TranspositionTable
+from swd_bot.state_hash import StateHash
 
 
 class MCTS:
-    root: GameTreeNode
+    EARLY_STOP_INTERVAL = 100
+    MEMORY_CHECK_INTERVAL = 1_000
+    # pruning goes below the budget so it doesn't run again right away
+    PRUNE_RATIO = 0.75
+
+    tree: GameTree
 
     def __init__(self,
                  state: GameState,
                  simulation_agent: Agent,
                  policy_agent: Agent,
-                 evaluation_function: Callable[[GameState], float]):
+                 evaluation_function: Callable[[GameState], float],
+                 lazy_states: bool = False,
+                 batch_evaluation_function: Optional[Callable[[List[GameState]], np.ndarray]] = None,
+                 transposition_table: Optional[TranspositionTable] = None,
+                 max_nodes: Optional[int] = None,
+                 max_bytes: Optional[int] = None,
+                 information_sets: bool = False,
+                 widening_coefficient: float = 1.0,
+                 widening_exponent: float = 0.5,
+                 prior_function: Optional[Callable[[GameState, List[Action]], np.ndarray]] = None):
+        # information set search samples hidden cards every simulation, so no sampled state can be kept
+        self.information_sets = information_sets
+        self.widening_coefficient = widening_coefficient
+        self.widening_exponent = widening_exponent
+        # PUCT selection is used when action priors are given
+        self.prior_function = prior_function
+        self.lazy_states = lazy_states or information_sets
+        self.max_nodes = max_nodes
+        self.max_bytes = max_bytes
+        self.state_bytes = len(pickle.dumps(state))
+        self.transposition_table = transposition_table
+        self.hash_states = transposition_table is not None and not information_sets
         self.prepare_mcts_root(state)
         self.simulation_agent = simulation_agent
+        self.rollout = BatchRollout(simulation_agent)
         self.policy_agent = policy_agent
         self.evaluation_function = evaluation_function
+        self.batch_evaluation_function = batch_evaluation_function
+        self.metrics = SearchMetrics()
 
     def prepare_mcts_root(self, state: GameState):
         if state.cards_board_state.preset is not None:
@@ -44,139 +81,564 @@ class MCTS:
             pos_to_replace = (cards_state.card_places == CLOSED_CARD) & (cards_state.preset[2] >= 66)
             cards_state.card_places[pos_to_replace] = CLOSED_PURPLE_CARD
             cards_state.preset = None
-        self.root = GameTreeNode(state, Game.get_available_actions(state), state.current_player_index)
+        self.tree = GameTree()
+        self.tree.add_node(-1, -1, state.current_player_index, state, self.state_hash(state))
+        self.set_node_actions(GameTree.ROOT, state)
+
+    def set_node_actions(self,
+                         node: int,
+                         state: GameState,
+                         actions: Optional[List[Action]] = None) -> List[Action]:
+        if actions is None:
+            actions = Game.get_available_actions(state)
+        if self.prior_function is None or len(actions) == 0:
+            self.tree.set_actions(node, actions, not self.lazy_states)
+            return actions
+        # priors are computed once per node, the actions are expanded in the prior order
+        priors = np.asarray(self.prior_function(state, actions), dtype=np.float32)
+        order = np.argsort(-priors, kind="stable")
+        actions = [actions[i] for i in order.tolist()]
+        self.tree.set_actions(node, actions, True, priors[order])
+        return actions
+
+    def action_prior(self, node: int, code: int) -> float:
+        # the prior of an action kept with the node's actions list, the list is kept until the node is expanded
+        actions, priors = self.tree.actions[node], self.tree.priors[node]
+        if actions is None or priors is None:
+            return 0.0
+        for action, prior in zip(actions, priors.tolist()):
+            if ActionCodec.encode(action) == code:
+                return prior
+        return 0.0
+
+    def state_hash(self, state: GameState) -> int:
+        return StateHash.hash(state) if self.hash_states else 0
 
     def run(self,
             exploration_coefficient: float = math.sqrt(2),
             playouts: int = 1,
             playout_limit: int = 1_000,
             simulations: int = 1_000_000,
-            max_time: int = math.inf):
+            max_time: int = math.inf,
+            batch_size: int = 1,
+            stop_event: Optional[threading.Event] = None,
+            early_stop: bool = False,
+            confidence_delta: float = 0.01,
+            progress_bar: bool = True,
+            metrics_callback: Optional[Callable[[SearchMetrics], None]] = None) -> SearchMetrics:
         start = time.time()
-        for _ in tqdm(range(simulations)):
-            if time.time() - start > max_time:
+        self.metrics = SearchMetrics()
+        simulations_count = 0
+        if early_stop and self.tree.actions_count[GameTree.ROOT] == 1:
+            return self.finish_metrics(start, simulations_count, metrics_callback)
+        next_check = self.EARLY_STOP_INTERVAL
+        next_memory_check = self.MEMORY_CHECK_INTERVAL
+        progress = tqdm(total=simulations, disable=not progress_bar)
+        while simulations_count < simulations and time.time() - start <= max_time:
+            if stop_event is not None and stop_event.is_set():
                 break
-            node = self.select(self.root, exploration_coefficient)
-            wins, total_games = self.expand_and_play(node, playouts, playout_limit)
-            self.propagate(node, wins, total_games)
-
-    def select(self, node: GameTreeNode, exploration_coefficient: float):
-        unchecked_action = None
-        for action in node.actions:
-            if str(action) not in node.children:
-                unchecked_action = action
+            if self.tree.proven[GameTree.ROOT] != GameTree.UNKNOWN:
                 break
-        if unchecked_action is not None:
-            action = unchecked_action
-            new_node = self.create_next_node(node.game_state, action)
-            node.children[str(action)] = new_node
-            new_node.parent = node
-            return new_node
-        elif len(node.children) > 0:
-            ucb = np.zeros(len(node.children))
-            for i, child in enumerate(node.children.values()):
-                if node.current_player_index == child.current_player_index:
-                    rate = child.rate()
-                else:
-                    rate = 1 - child.rate()
-                # bonus = 0 if Game.is_finished(child.game_state) else 0.01
-                # ucb[i] = rate + exploration_coefficient * math.sqrt(math.log(node.total_games) / child.total_games) + bonus
-                ucb[i] = rate + exploration_coefficient * math.sqrt(node.total_games) / (child.total_games + 1)
-            best_action = None
-            for index in (-ucb).argsort():
-                action_name = list(node.children.items())[index][0]
-                for action in node.actions:
-                    if str(action) == action_name:
-                        best_action = action
-                        break
-                if best_action is not None:
+            if early_stop and simulations_count >= next_check:
+                next_check += self.EARLY_STOP_INTERVAL
+                if self.is_decided(confidence_delta):
                     break
-            temp_node = self.create_next_node(node.game_state, best_action)
-            next_node = node.children[str(best_action)]
-            next_node.game_state = temp_node.game_state
-            next_node.actions = temp_node.actions
-            if next_node.game_state.age != node.game_state.age:
-                return next_node
-            return self.select(next_node, exploration_coefficient)
+            if simulations_count >= next_memory_check:
+                next_memory_check += self.MEMORY_CHECK_INTERVAL
+                self.enforce_memory_budget()
+            if batch_size > 1:
+                count = self.run_batch(exploration_coefficient, playouts, playout_limit, batch_size)
+            else:
+                node, state = self.timed_select(exploration_coefficient)
+                wins, total_games = self.expand_and_play(node, state, playouts, playout_limit)
+                propagation_start = time.perf_counter()
+                self.propagate(node, wins, total_games)
+                self.metrics.propagation_time += time.perf_counter() - propagation_start
+                count = 1
+            simulations_count += count
+            progress.update(count)
+        progress.close()
+        return self.finish_metrics(start, simulations_count, metrics_callback)
+
+    def finish_metrics(self,
+                       start: float,
+                       simulations_count: int,
+                       metrics_callback: Optional[Callable[[SearchMetrics], None]]) -> SearchMetrics:
+        tree = self.tree
+        metrics = self.metrics
+        metrics.simulations = simulations_count
+        metrics.total_time = time.time() - start
+        metrics.tree_size = tree.size
+        metrics.memory_footprint = self.memory_footprint()
+        children_count = tree.children_count[:tree.size]
+        metrics.branching_factor = float(children_count[children_count > 0].mean()) if children_count.any() else 0.0
+        metrics.root_codes, metrics.root_visits, metrics.root_rates = self.root_statistics()
+        if metrics_callback is not None:
+            metrics_callback(metrics)
+        return metrics
+
+    def timed_select(self, exploration_coefficient: float) -> Tuple[int, GameState]:
+        # expansion, state clones and lazy replays are timed on their own inside the selection
+        start = time.perf_counter()
+        other_time = self.metrics.expansion_time + self.metrics.replay_time
+        node, state = self.select(exploration_coefficient)
+        elapsed = time.perf_counter() - start
+        self.metrics.selection_time += elapsed - (self.metrics.expansion_time + self.metrics.replay_time - other_time)
+        return node, state
+
+    def clone_state(self, state: GameState) -> GameState:
+        start = time.perf_counter()
+        state = state.clone()
+        self.metrics.replay_time += time.perf_counter() - start
+        return state
+
+    def replay_action(self, state: GameState, node: int):
+        start = time.perf_counter()
+        Game.apply_action(state, ActionCodec.decode(self.tree.action[node], state))
+        self.metrics.replay_time += time.perf_counter() - start
+
+    def is_decided(self, confidence_delta: float) -> bool:
+        _, visits, rates = self.root_statistics()
+        if len(visits) < 2:
+            return len(visits) == 1 and self.tree.is_expanded(GameTree.ROOT)
+        # the move is played by rate, so the search stops once the Hoeffding bounds of the two best rated
+        # children don't overlap
+        order = np.argsort(-rates)
+        best, second = order[0], order[1]
+        radius = np.sqrt(np.log(2 / confidence_delta) / (2 * np.maximum(visits, 1)))
+        return rates[best] - radius[best] > rates[second] + radius[second]
+
+    def run_batch(self, exploration_coefficient: float, playouts: int, playout_limit: int, batch_size: int) -> int:
+        leaves = []
+        for _ in range(batch_size):
+            node, state = self.timed_select(exploration_coefficient)
+            leaves.append((node, state, self.apply_virtual_loss(node)))
+
+        nodes = np.array([node for node, _, _ in leaves], dtype=np.int32)
+        rollout_states = [state for _, state, _ in leaves for _ in range(playouts)]
+        rollout_start = time.perf_counter()
+        final_states = self.rollout.play(rollout_states, playout_limit)
+        self.metrics.rollout_time += time.perf_counter() - rollout_start
+        players = np.repeat(self.tree.player[nodes], playouts)
+        results = BatchRollout.results(players, final_states, self.evaluate_batch)
+        values = results.reshape(len(leaves), playouts).mean(axis=1)
+
+        propagation_start = time.perf_counter()
+        for (node, _, virtual_loss), value in zip(leaves, values.tolist()):
+            self.revert_virtual_loss(*virtual_loss)
+            self.propagate(node, value, 1)
+        self.metrics.propagation_time += time.perf_counter() - propagation_start
+        return batch_size
+
+    def evaluate_batch(self, states: List[GameState]) -> np.ndarray:
+        if len(states) == 0:
+            return np.zeros(0)
+        start = time.perf_counter()
+        if self.batch_evaluation_function is not None:
+            values = self.batch_evaluation_function(states)
         else:
-            return node
+            values = np.array([self.evaluation_function(state) for state in states])
+        self.metrics.evaluation_time += time.perf_counter() - start
+        return values
 
-    def expand_and_play(self, node: GameTreeNode, playouts: int = 1, playout_limit: int = 1_000) -> Tuple[float, int]:
-        wins = 0
-        agent = self.simulation_agent
-        for _ in range(playouts):
-            state = node.game_state.clone()
-            moves_count = 0
-            while not Game.is_finished(state) and moves_count < playout_limit:
-                actions = Game.get_available_actions(state)
-                selected_action = agent.choose_action(state, actions)
-                Game.apply_action(state, selected_action)
-                moves_count += 1
-
-            if Game.is_finished(state):
-                if state.winner == node.current_player_index:
-                    wins += 1
+    def apply_virtual_loss(self, node: int) -> Tuple[np.ndarray, np.ndarray]:
+        tree = self.tree
+        path = tree.path_to_root(node)
+        parents = tree.parent[path]
+        # every node of the path counts as a lost game for the player who moved into it
+        losses = np.where((parents >= 0) & (tree.player[path] != tree.player[parents]), 1.0, 0.0)
+        tree.visits[path] += 1
+        tree.wins[path] += losses
+        tree.update_rates(path)
+        return path, losses
+
+    def revert_virtual_loss(self, path: np.ndarray, losses: np.ndarray):
+        self.tree.visits[path] -= 1
+        self.tree.wins[path] -= losses
+        self.tree.update_rates(path)
+
+    def select(self, exploration_coefficient: float) -> Tuple[int, GameState]:
+        if self.information_sets:
+            return self.select_information_set(exploration_coefficient)
+        tree = self.tree
+        node = GameTree.ROOT
+        state = tree.states[node]
+        # in lazy mode the state is replayed from the last stored one, cloned once before the first applied action
+        owned_state = False
+        while True:
+            if not tree.is_expanded(node):
+                actions = tree.actions[node]
+                if actions is None:
+                    actions = self.set_node_actions(node, state)
+                if tree.children_count[node] < len(actions):
+                    children_codes = set(tree.action[tree.children(node)].tolist())
+                    for i, action in enumerate(actions):
+                        code = ActionCodec.encode(action)
+                        if code not in children_codes:
+                            prior = 0.0
+                            if self.prior_function is not None:
+                                prior = float(tree.priors[node][i])
+                                if not self.expand_first(node, prior, exploration_coefficient):
+                                    break
+                            if not owned_state:
+                                state = self.clone_state(state)
+                            child = self.create_next_node(node, code, action, state, prior)
+                            if self.lazy_states and tree.is_expanded(node):
+                                tree.set_actions(node, actions, False)
+                            return child, state
+
+            if tree.children_count[node] == 0:
+                return node, state
+
+            children = tree.children(node)
+            # solved subtrees need no more simulations
+            children = children[tree.proven[children] == GameTree.UNKNOWN]
+            if len(children) == 0:
+                return node, state
+            if self.prior_function is not None:
+                ucb = self.puct_scores(node, children, exploration_coefficient)
             else:
-                value = self.evaluation_function(state)
-                if state.current_player_index != node.game_state.current_player_index:
-                    value = 1 - value
-                wins += value
-        return wins / playouts, 1
+                rates = self.children_rates(node, children)
+                # ucb = rates + exploration_coefficient * np.sqrt(math.log(tree.visits[node]) / tree.visits[children])
+                ucb = rates + exploration_coefficient * math.sqrt(tree.visits[node]) / (tree.visits[children] + 1)
+            next_node = children[ucb.argmax()]
+
+            if tree.chance[next_node]:
+                if not owned_state:
+                    state = self.clone_state(state)
+                node, state, new_outcome = self.sample_outcome(next_node, state)
+                owned_state = False
+                if new_outcome:
+                    return node, state
+                continue
 
-    def propagate(self, node: GameTreeNode, wins: float, total_games: int):
-        player_index = node.current_player_index
-        while node is not None:
-            node.total_games += total_games
-            if node.current_player_index == player_index:
-                node.wins += wins
+            if tree.states[next_node] is not None:
+                state = tree.states[next_node]
+                owned_state = False
             else:
-                node.wins += total_games - wins
-            node = node.parent
+                if not owned_state:
+                    state = self.clone_state(state)
+                    owned_state = True
+                self.replay_action(state, next_node)
+            node = next_node
 
-    def create_next_node(self, state: GameState, action: Action) -> GameTreeNode:
-        state = state.clone()
+    def puct_scores(self, node: int, children: np.ndarray, exploration_coefficient: float) -> np.ndarray:
+        tree = self.tree
+        exploration = exploration_coefficient * math.sqrt(tree.visits[node]) / (tree.visits[children] + 1)
+        return self.children_rates(node, children) + tree.prior[children] * exploration
+
+    def expand_first(self, node: int, prior: float, exploration_coefficient: float) -> bool:
+        # the next unexpanded action competes with the existing children, valued as its parent
+        tree = self.tree
+        children = tree.children(node)
+        children = children[tree.proven[children] == GameTree.UNKNOWN]
+        if len(children) == 0:
+            return True
+        score = tree.rate[node] + exploration_coefficient * prior * math.sqrt(tree.visits[node])
+        return score >= self.puct_scores(node, children, exploration_coefficient).max()
+
+    def sample_outcome(self, node: int, state: GameState) -> Tuple[int, GameState, bool]:
+        # state is the parent's one, owned by the caller
+        tree = self.tree
+        outcomes = tree.children(node)
+        # progressive widening: the number of sampled outcomes grows with the visits of the chance node
+        max_outcomes = math.ceil(self.widening_coefficient * (tree.visits[node] + 1) ** self.widening_exponent)
+        if len(outcomes) < max_outcomes:
+            # sampling a new outcome is the expansion of the chance node
+            start = time.perf_counter()
+            MCTS.shuffle_hidden_cards(state)
+            action = ActionCodec.decode(tree.action[node], state)
+            state_hash = self.apply_action(state, action)
+            self.metrics.expansion_time += time.perf_counter() - start
+            for outcome in outcomes.tolist():
+                if MCTS.same_outcome(tree.states[outcome], state):
+                    return outcome, tree.states[outcome], False
+            return tree.add_node(node, -1, state.current_player_index, state, state_hash), state, True
+        outcome = int(outcomes[random.randrange(len(outcomes))])
+        return outcome, tree.states[outcome], False
+
+    @staticmethod
+    def same_outcome(state: GameState, other_state: GameState) -> bool:
+        return state.age == other_state.age and np.array_equal(state.cards_board_state.card_places,
+                                                               other_state.cards_board_state.card_places)
+
+    def select_information_set(self, exploration_coefficient: float) -> Tuple[int, GameState]:
+        tree = self.tree
+        node = GameTree.ROOT
+        state = self.clone_state(tree.states[node])
+        MCTS.shuffle_hidden_cards(state)
+        # nodes are action histories shared by all determinizations, children are filtered by legality
+        while True:
+            actions = Game.get_available_actions(state)
+            if len(actions) == 0:
+                return node, state
+            codes = np.fromiter(map(ActionCodec.encode, actions), dtype=np.int64, count=len(actions))
+            children = tree.children(node)
+            children_codes = tree.action[children]
+            missing = np.flatnonzero(~np.isin(codes, children_codes))
+            if len(missing) > 0:
+                i = int(missing[0])
+                return self.create_next_node(node, int(codes[i]), actions[i], state), state
+
+            children = children[np.isin(children_codes, codes)]
+            tree.availability[children] += 1
+            rates = self.children_rates(node, children)
+            ucb = rates + exploration_coefficient * np.sqrt(tree.availability[children]) / (tree.visits[children] + 1)
+            next_node = children[ucb.argmax()]
+
+            self.replay_action(state, next_node)
+            node = next_node
+
+    @staticmethod
+    def shuffle_hidden_cards(state: GameState):
+        random.shuffle(state.cards_board_state.card_ids)
+        random.shuffle(state.cards_board_state.purple_card_ids)
+
+    def create_next_node(self, node: int, code: int, action: Action, state: GameState, prior: float = 0.0) -> int:
+        start = time.perf_counter()
+        tree = self.tree
+        age = state.age
+        closed_cards = MCTS.closed_cards_count(state)
+        if not self.information_sets:
+            # the first outcome of a chance node is a sample too, the real deck order must not leak into it
+            MCTS.shuffle_hidden_cards(state)
+        state_hash = self.apply_action(state, action)
+        finished = Game.is_finished(state)
+        # age transitions and revealed closed cards are random, such actions lead to a chance node
+        chance_event = state.age != age or MCTS.closed_cards_count(state) != closed_cards
+        if chance_event and not finished and not self.information_sets:
+            chance_node = tree.add_node(node, code, state.current_player_index, None)
+            tree.chance[chance_node] = True
+            tree.prior[chance_node] = prior
+            child = tree.add_node(chance_node, -1, state.current_player_index, state, state_hash)
+        else:
+            stored_state = state if not self.lazy_states else None
+            child = tree.add_node(node, code, state.current_player_index, stored_state, state_hash)
+            tree.prior[child] = prior
+            if finished and not self.information_sets:
+                tree.set_actions(child, [], not self.lazy_states)
+                tree.proven[child] = self.outcome(state, state.current_player_index)
+        self.metrics.expansion_time += time.perf_counter() - start
+        return child
+
+    def apply_action(self, state: GameState, action: Action) -> int:
         Game.apply_action(state, action)
-        actions = Game.get_available_actions(state)
-        return GameTreeNode(state, actions, state.current_player_index)
+        # one action can cascade over the board, both players and the military, so the state is rehashed once
+        return StateHash.hash(state) if self.hash_states else 0
+
+    @staticmethod
+    def outcome(state: GameState, player: int) -> int:
+        if state.winner == player:
+            return GameTree.WIN
+        if state.winner == 1 - player:
+            return GameTree.LOSS
+        return GameTree.DRAW
+
+    @staticmethod
+    def closed_cards_count(state: GameState) -> int:
+        card_places = state.cards_board_state.card_places
+        return np.count_nonzero((card_places == CLOSED_CARD) | (card_places == CLOSED_PURPLE_CARD))
+
+    def expand_and_play(self,
+                        node: int,
+                        node_state: GameState,
+                        playouts: int = 1,
+                        playout_limit: int = 1_000) -> Tuple[float, int]:
+        if playouts > 1:
+            rollout_start = time.perf_counter()
+            final_states = self.rollout.play([node_state] * playouts, playout_limit)
+            self.metrics.rollout_time += time.perf_counter() - rollout_start
+            players = np.full(playouts, self.tree.player[node])
+            return float(BatchRollout.results(players, final_states, self.evaluate_batch).mean()), 1
+        wins = 0
+        for _ in range(playouts):
+            rollout_start = time.perf_counter()
+            state = self.playout(node_state, playout_limit)
+            self.metrics.rollout_time += time.perf_counter() - rollout_start
+            wins += self.playout_result(node, node_state, state)
+        return wins / playouts, 1
+
+    def playout(self, node_state: GameState, playout_limit: int) -> GameState:
+        agent = self.simulation_agent
+        state = node_state.clone()
+        moves_count = 0
+        while not Game.is_finished(state) and moves_count < playout_limit:
+            actions = Game.get_available_actions(state)
+            selected_action = agent.choose_action(state, actions)
+            Game.apply_action(state, selected_action)
+            moves_count += 1
+        return state
+
+    def playout_result(self,
+                       node: int,
+                       node_state: GameState,
+                       state: GameState,
+                       value: Optional[float] = None) -> float:
+        if Game.is_finished(state):
+            return float(state.winner == self.tree.player[node])
+        if value is None:
+            start = time.perf_counter()
+            value = self.evaluation_function(state)
+            self.metrics.evaluation_time += time.perf_counter() - start
+        if state.current_player_index != node_state.current_player_index:
+            value = 1 - value
+        return value
+
+    def propagate(self, node: int, wins: float, total_games: int):
+        tree = self.tree
+        path = tree.path_to_root(node)
+        self.metrics.add_depth(len(path) - 1)
+        path_wins = np.where(tree.player[path] == tree.player[node], wins, total_games - wins)
+        tree.visits[path] += total_games
+        tree.wins[path] += path_wins
+        tree.rate[path] = tree.wins[path] / tree.visits[path]
+        if self.hash_states:
+            # equivalent positions reached by other move orders share their statistics
+            for path_node, path_node_wins in zip(path.tolist(), path_wins.tolist()):
+                if tree.chance[path_node]:
+                    continue
+                key = int(tree.hash[path_node])
+                self.transposition_table.add(key, total_games, path_node_wins)
+                visits, table_wins = self.transposition_table.get(key)
+                if visits > tree.visits[path_node]:
+                    tree.rate[path_node] = table_wins / visits
+        for path_node in path[tree.has_discard_children[path]].tolist():
+            tree.update_discard_rate(path_node)
+        self.propagate_proof(node)
+
+    def propagate_proof(self, node: int):
+        tree = self.tree
+        while tree.proven[node] != GameTree.UNKNOWN:
+            if tree.proven[node] != GameTree.DRAW:
+                tree.rate[node] = float(tree.proven[node] == GameTree.WIN)
+            parent = tree.parent[node]
+            # a sampled outcome doesn't decide the value of its chance node
+            if parent < 0 or tree.chance[parent]:
+                break
+            tree.proven[parent] = tree.solve(parent)
+            node = parent
+
+    def children_rates(self, node: int, children: np.ndarray) -> np.ndarray:
+        tree = self.tree
+        rates = tree.rate[children]
+        return np.where(tree.player[children] == tree.player[node], rates, 1 - rates)
+
+    def child_rate(self, node: int, child: int) -> float:
+        return float(self.children_rates(node, np.array([child]))[0])
 
     def shrink_tree(self, made_action: Action, new_state: GameState):
-        if str(made_action) in self.root.children:
-            new_root = self.root.children[str(made_action)]
-            new_root.game_state = new_state
-            available_actions = Game.get_available_actions(new_root.game_state)
-            new_root.actions = available_actions
-            new_root.parent = None
-            actions_to_delete = [x for x in new_root.children.keys() if x not in map(str, available_actions)]
-            for action in actions_to_delete:
-                new_root.children[action].parent = None
-                del new_root.children[action]
-            self.root = new_root
+        tree = self.tree
+        new_root = tree.find_child(GameTree.ROOT, ActionCodec.encode(made_action))
+        if new_root >= 0 and tree.chance[new_root]:
+            # only the sampled outcome matching the real reveal keeps its subtree
+            outcomes = [outcome for outcome in tree.children(new_root).tolist()
+                        if MCTS.same_outcome(tree.states[outcome], new_state)]
+            new_root = outcomes[0] if len(outcomes) > 0 else -1
+        if new_root >= 0:
+            available_actions = Game.get_available_actions(new_state)
+            available_codes = set(map(ActionCodec.encode, available_actions))
+            for code, child in tree.children_by_code(new_root).items():
+                if code not in available_codes:
+                    tree.detach(child)
+            tree.reroot(new_root)
+            tree.set_state(GameTree.ROOT, new_state)
+            tree.hash[GameTree.ROOT] = self.state_hash(new_state)
+            self.set_node_actions(GameTree.ROOT, new_state, available_actions)
         else:
             self.prepare_mcts_root(new_state)
 
+    def load_tree(self, path: str):
+        root_state = self.tree.states[GameTree.ROOT]
+        self.tree = GameTree.load(path, root_state)
+        self.tree.hash[GameTree.ROOT] = self.state_hash(root_state)
+        self.set_node_actions(GameTree.ROOT, root_state)
+
+    def warm_start(self, codes: np.ndarray, visits: np.ndarray, wins: np.ndarray):
+        # wins are counted for the root player
+        tree = self.tree
+        root_state = tree.states[GameTree.ROOT]
+        actions = {ActionCodec.encode(action): action for action in Game.get_available_actions(root_state)}
+        for code, code_visits, code_wins in zip(codes.tolist(), visits.tolist(), wins.tolist()):
+            if code not in actions:
+                continue
+            child = tree.find_child(GameTree.ROOT, code)
+            if child < 0:
+                self.create_next_node(GameTree.ROOT, code, actions[code], root_state.clone(),
+                                      self.action_prior(GameTree.ROOT, code))
+                child = tree.find_child(GameTree.ROOT, code)
+            tree.visits[child] += code_visits
+            if tree.player[child] == tree.player[GameTree.ROOT]:
+                tree.wins[child] += code_wins
+            else:
+                tree.wins[child] += code_visits - code_wins
+            tree.visits[GameTree.ROOT] += code_visits
+            tree.wins[GameTree.ROOT] += code_wins
+            tree.update_rates(np.array([child, GameTree.ROOT], dtype=np.int32))
+
+    def proven_win_code(self) -> Optional[int]:
+        tree = self.tree
+        for child in tree.children(GameTree.ROOT).tolist():
+            outcome = tree.proven[child]
+            if tree.player[child] != tree.player[GameTree.ROOT]:
+                outcome = GameTree.OPPONENT_OUTCOMES[outcome]
+            if outcome == GameTree.WIN:
+                return int(tree.action[child])
+        return None
+
+    def memory_footprint(self) -> int:
+        return self.tree.memory_footprint(self.state_bytes)
+
+    def enforce_memory_budget(self):
+        tree = self.tree
+        max_nodes = self.max_nodes
+        if self.max_bytes is not None and self.memory_footprint() > self.max_bytes:
+            # cached states are rebuilt by replay, so they go first
+            extra_bytes = self.memory_footprint() - self.max_bytes
+            tree.drop_states(tree.stored_states - math.ceil(extra_bytes / self.state_bytes))
+            if self.memory_footprint() > self.max_bytes:
+                node_bytes = sum(np.dtype(dtype).itemsize for dtype, _ in GameTree.NODE_ARRAYS.values())
+                node_bytes += self.state_bytes * tree.stored_states / tree.size
+                budget_nodes = int(self.max_bytes // node_bytes)
+                max_nodes = budget_nodes if max_nodes is None else min(max_nodes, budget_nodes)
+        if max_nodes is not None and tree.size > max_nodes:
+            tree.prune(max(1, int(max_nodes * self.PRUNE_RATIO)))
+
+    def root_statistics(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        tree = self.tree
+        children = tree.children(GameTree.ROOT)
+        return tree.action[children], tree.visits[children], self.children_rates(GameTree.ROOT, children)
+
     def print_optimal_path(self, depth: int = 1):
-        node = self.root
+        tree = self.tree
+        node = GameTree.ROOT
+        state = tree.states[node].clone()
         count = 0
-        while node is not None and count < depth:
-            print(f"Player {node.current_player_index}")
-            best_action = ""
+        while node >= 0 and count < depth:
+            print(f"Player {tree.player[node]}")
+            best_child = -1
             max_score = -1
             children = []
-            for action, child in node.children.items():
-                if node.current_player_index == child.current_player_index:
-                    rate = child.rate()
-                else:
-                    rate = 1 - child.rate()
-                children.append((action, rate, child))
+            for child in tree.children(node):
+                rate = self.child_rate(node, child)
+                children.append((ActionCodec.decode(tree.action[child], state), rate, child))
                 if rate > max_score:
-                    best_action = action
+                    best_child = child
                     max_score = rate
             for action, rate, child in sorted(children, key=lambda x: -x[1]):
-                print(f"{action} {round(rate, 2)}, {child.total_games}")
-            if best_action == "":
-                print(f"Winner: {node.game_state.winner}")
-                print(f"{Game.points(node.game_state, 0), node.game_state.players_state[0].coins} "
-                      f"{Game.points(node.game_state, 1), node.game_state.players_state[1].coins}")
+                print(f"{action} {round(rate, 2)}, {tree.visits[child]}")
+            if best_child < 0:
+                print(f"Winner: {state.winner}")
+                print(f"{Game.points(state, 0), state.players_state[0].coins} "
+                      f"{Game.points(state, 1), state.players_state[1].coins}")
                 break
-            node = node.children[best_action]
+            if tree.chance[best_child]:
+                outcomes = tree.children(best_child)
+                if len(outcomes) == 0:
+                    break
+                best_child = int(outcomes[tree.visits[outcomes].argmax()])
+            if tree.states[best_child] is not None:
+                state = tree.states[best_child].clone()
+            else:
+                Game.apply_action(state, ActionCodec.decode(tree.action[best_child], state))
+            node = best_child
             count += 1
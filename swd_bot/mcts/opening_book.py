@@ -0,0 +1,74 @@
+from typing import Tuple, List
+
+import numpy as np
+from swd.states.game_state import GameState
+
+from swd_bot.mcts.game_tree import GameTree
+from swd_bot.state_hash import StateHash
+
+# hidden cards are not part of the state hash, so the key depends only on the visible state
+BOOK_DTYPE = np.dtype([("hash", np.uint64), ("action", np.int32), ("visits", np.int64), ("wins", np.float64)])
+
+
+# Root statistics of long searches sorted by state hash, the file is memory-mapped and binary searched
+class OpeningBook:
+    def __init__(self, path: str):
+        self.entries = np.load(path, mmap_mode="r")
+
+    def lookup(self, state: GameState) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        key = StateHash.hash(state)
+        start = self.lower_bound(key)
+        end = self.lower_bound(key + 1) if key < np.iinfo(np.uint64).max else len(self.entries)
+        entries = np.array(self.entries[start:end])
+        return entries["action"], entries["visits"], entries["wins"]
+
+    def lower_bound(self, key: int) -> int:
+        # reads only log(n) records of the mapped file
+        low, high = 0, len(self.entries)
+        while low < high:
+            middle = (low + high) // 2
+            if int(self.entries[middle]["hash"]) < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    @staticmethod
+    def tree_entries(tree: GameTree, plies: int, min_visits: int) -> np.ndarray:
+        nodes = tree.subtree(GameTree.ROOT, plies - 1)
+        # chance nodes have no state of their own, their outcomes are looked up instead
+        nodes = nodes[(tree.visits[nodes] >= min_visits) & ~tree.chance[nodes]]
+        entries = []
+        for node in nodes.tolist():
+            children = tree.children(node)
+            children = children[tree.visits[children] > 0]
+            if len(children) == 0:
+                continue
+            visits = tree.visits[children]
+            wins = np.where(tree.player[children] == tree.player[node],
+                            tree.wins[children],
+                            visits - tree.wins[children])
+            node_entries = np.zeros(len(children), dtype=BOOK_DTYPE)
+            node_entries["hash"] = tree.hash[node]
+            node_entries["action"] = tree.action[children]
+            node_entries["visits"] = visits
+            node_entries["wins"] = wins
+            entries.append(node_entries)
+        if len(entries) == 0:
+            return np.zeros(0, dtype=BOOK_DTYPE)
+        return np.concatenate(entries)
+
+    @staticmethod
+    def save(path: str, entries: List[np.ndarray]):
+        entries = np.concatenate(entries) if len(entries) > 0 else np.zeros(0, dtype=BOOK_DTYPE)
+        entries = entries[np.lexsort((entries["action"], entries["hash"]))]
+        # the same position found in several searches is merged into one record per action
+        starts = np.flatnonzero(np.concatenate([
+            [True],
+            (entries["hash"][1:] != entries["hash"][:-1]) | (entries["action"][1:] != entries["action"][:-1])
+        ])) if len(entries) > 0 else np.zeros(0, dtype=np.int64)
+        merged = entries[starts]
+        if len(entries) > 0:
+            merged["visits"] = np.add.reduceat(entries["visits"], starts)
+            merged["wins"] = np.add.reduceat(entries["wins"], starts)
+        np.save(path, merged)
@@ -0,0 +1,58 @@
+import multiprocessing
+import random
+from typing import Callable, Dict, Any, Tuple, Optional
+
+import numpy as np
+from swd.states.game_state import GameState
+
+from swd_bot.mcts.mcts import MCTS
+
+MCTSFactory = Callable[[GameState], MCTS]
+
+_worker_mcts_factory: Optional[MCTSFactory] = None
+
+
+def _init_worker(create_mcts_factory: Callable[[], MCTSFactory]):
+    global _worker_mcts_factory
+    _worker_mcts_factory = create_mcts_factory()
+
+
+def _search(state: GameState,
+            run_parameters: Dict[str, Any],
+            seed: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray, int]:
+    # every worker searches its own determinization of the hidden cards
+    random.seed(seed)
+    np.random.seed(seed)
+    MCTS.shuffle_hidden_cards(state)
+    mcts = _worker_mcts_factory(state)
+    metrics = mcts.run(**run_parameters)
+    return metrics.root_codes, metrics.root_visits, metrics.root_rates, metrics.simulations
+
+
+class RootParallelMCTS:
+    def __init__(self, workers: int, create_mcts_factory: Callable[[], MCTSFactory]):
+        self.workers = workers
+        context = multiprocessing.get_context("spawn")
+        self.pool = context.Pool(workers, initializer=_init_worker, initargs=(create_mcts_factory,))
+
+    def run(self, state: GameState, **run_parameters) -> Tuple[np.ndarray, np.ndarray, np.ndarray, int]:
+        seeds = np.random.randint(0, 2 ** 31 - 1, size=self.workers)
+        results = self.pool.starmap(_search, [(state, run_parameters, int(seed)) for seed in seeds])
+
+        visits: Dict[int, int] = {}
+        wins: Dict[int, float] = {}
+        total_simulations = 0
+        for worker_codes, worker_visits, worker_rates, simulations in results:
+            for code, code_visits, rate in zip(worker_codes.tolist(), worker_visits.tolist(), worker_rates.tolist()):
+                visits[code] = visits.get(code, 0) + code_visits
+                wins[code] = wins.get(code, 0) + rate * code_visits
+            total_simulations += simulations
+
+        codes = np.array(list(visits.keys()), dtype=np.int32)
+        merged_visits = np.array([visits[code] for code in codes.tolist()], dtype=np.int64)
+        merged_rates = np.array([wins[code] for code in codes.tolist()]) / np.maximum(merged_visits, 1)
+        return codes, merged_visits, merged_rates, total_simulations
+
+    def close(self):
+        self.pool.close()
+        self.pool.join()
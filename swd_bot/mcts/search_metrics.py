@@ -0,0 +1,56 @@
+from typing import Dict, Any
+
+import numpy as np
+
+
+# Per-search counters filled by MCTS.run, times are wall clock seconds
+class SearchMetrics:
+    def __init__(self):
+        self.simulations = 0
+        self.total_time = 0.0
+        self.selection_time = 0.0
+        self.expansion_time = 0.0
+        # state clones and lazy replays of the selection
+        self.replay_time = 0.0
+        self.rollout_time = 0.0
+        self.evaluation_time = 0.0
+        self.propagation_time = 0.0
+        self.depth_sum = 0
+        self.depth_count = 0
+        self.max_depth = 0
+        self.tree_size = 0
+        self.memory_footprint = 0
+        self.branching_factor = 0.0
+        self.root_codes = np.zeros(0, dtype=np.int32)
+        self.root_visits = np.zeros(0, dtype=np.int64)
+        self.root_rates = np.zeros(0)
+
+    def add_depth(self, depth: int):
+        self.depth_sum += depth
+        self.depth_count += 1
+        self.max_depth = max(self.max_depth, depth)
+
+    def simulations_per_second(self) -> float:
+        return self.simulations / self.total_time if self.total_time > 0 else 0.0
+
+    def average_depth(self) -> float:
+        return self.depth_sum / max(self.depth_count, 1)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "simulations": self.simulations,
+            "simulations_per_second": self.simulations_per_second(),
+            "total_time": self.total_time,
+            "selection_time": self.selection_time,
+            "expansion_time": self.expansion_time,
+            "replay_time": self.replay_time,
+            "rollout_time": self.rollout_time,
+            "evaluation_time": self.evaluation_time,
+            "propagation_time": self.propagation_time,
+            "max_depth": self.max_depth,
+            "average_depth": self.average_depth(),
+            "branching_factor": self.branching_factor,
+            "tree_size": self.tree_size,
+            "memory_footprint": self.memory_footprint,
+            "root_visits": dict(zip(self.root_codes.tolist(), self.root_visits.tolist())),
+        }
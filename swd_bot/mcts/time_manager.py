@@ -0,0 +1,31 @@
+import numpy as np
+from swd.cards_board import NO_CARD
+from swd.states.game_state import GameState
+
+
+class TimeManager:
+    # later ages are more decisive, so they get a larger share of the bank per move
+    AGE_WEIGHTS = (0.8, 1.0, 1.3)
+    AGE_CARDS = 20
+
+    def __init__(self, time_bank: float, min_move_time: float = 0.5, max_move_time: float = 30):
+        self.time_bank = time_bank
+        self.min_move_time = min_move_time
+        self.max_move_time = max_move_time
+
+    def move_time(self, state: GameState) -> float:
+        age = min(state.age, len(self.AGE_WEIGHTS) - 1)
+        move_time = self.time_bank * self.AGE_WEIGHTS[age] / self.remaining_weighted_moves(state)
+        return float(np.clip(move_time, self.min_move_time, max(self.min_move_time, self.max_move_time)))
+
+    def remaining_weighted_moves(self, state: GameState) -> float:
+        age = min(state.age, len(self.AGE_WEIGHTS) - 1)
+        cards_left = np.count_nonzero(np.asarray(state.cards_board_state.card_places) != NO_CARD)
+        # every player takes about half of the cards of each age
+        moves = max(cards_left / 2, 1) * self.AGE_WEIGHTS[age]
+        for next_age in range(age + 1, len(self.AGE_WEIGHTS)):
+            moves += self.AGE_CARDS / 2 * self.AGE_WEIGHTS[next_age]
+        return moves
+
+    def spend(self, seconds: float):
+        self.time_bank = max(0.0, self.time_bank - seconds)
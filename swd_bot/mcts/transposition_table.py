@@ -0,0 +1,39 @@
+from typing import Optional, Tuple
+
+import numpy as np
+
+
+# Fixed-size hash table of (visits, wins) keyed by state hash, a full bucket replaces its least visited entry
+class TranspositionTable:
+    def __init__(self, size: int = 1 << 20, bucket_size: int = 4):
+        self.buckets_count = max(1, size // bucket_size)
+        self.bucket_size = bucket_size
+        self.keys = np.zeros((self.buckets_count, bucket_size), dtype=np.uint64)
+        self.used = np.zeros((self.buckets_count, bucket_size), dtype=bool)
+        self.visits = np.zeros((self.buckets_count, bucket_size), dtype=np.int64)
+        self.wins = np.zeros((self.buckets_count, bucket_size), dtype=np.float64)
+
+    def find(self, key: int) -> Tuple[int, int]:
+        bucket = key % self.buckets_count
+        slots = np.flatnonzero(self.used[bucket] & (self.keys[bucket] == np.uint64(key)))
+        return bucket, int(slots[0]) if len(slots) > 0 else -1
+
+    def get(self, key: int) -> Optional[Tuple[int, float]]:
+        bucket, slot = self.find(key)
+        if slot < 0:
+            return None
+        return int(self.visits[bucket, slot]), float(self.wins[bucket, slot])
+
+    def add(self, key: int, visits: int, wins: float):
+        bucket, slot = self.find(key)
+        if slot < 0:
+            slot = int(np.argmin(np.where(self.used[bucket], self.visits[bucket], -1)))
+            self.keys[bucket, slot] = np.uint64(key)
+            self.used[bucket, slot] = True
+            self.visits[bucket, slot] = 0
+            self.wins[bucket, slot] = 0
+        self.visits[bucket, slot] += visits
+        self.wins[bucket, slot] += wins
+
+    def clear(self):
+        self.used[:] = False
@@ -0,0 +1,45 @@
+import os
+from typing import Dict
+
+DEFAULT_MODEL = "manual_v2"
+# name -> weights file name
+MODEL_FILES: Dict[str, str] = {
+    "manual_v2": "model_manual_v2_acc54.5.pth",
+}
+# "<name>_int8" is the dynamic int8 quantization of <name>,
+# "<name>_student64x32" is a TorchBaseline with hidden layers 64 and 32 distilled from <name>
+QUANTIZED_SUFFIX = "_int8"
+STUDENT_SUFFIX = "_student"
+# weights of LinearRolloutAgent distilled by train/distill_rollout_policy.py
+ROLLOUT_POLICY_FILE = "rollout_policy.npz"
+
+
+# Location of model files by name, free of torch so the NumPy inference path resolves models the same way
+class ModelPaths:
+    models_dir = os.environ.get("SWD_BOT_MODELS_DIR", "../models")
+    paths: Dict[str, str] = {}
+
+    @staticmethod
+    def file_name(name: str) -> str:
+        if name in MODEL_FILES:
+            return MODEL_FILES[name]
+        teacher, _, hidden = name.rpartition(STUDENT_SUFFIX)
+        if teacher not in MODEL_FILES:
+            raise KeyError(name)
+        return f"{os.path.splitext(MODEL_FILES[teacher])[0]}{STUDENT_SUFFIX}{hidden}.pth"
+
+    @staticmethod
+    def path(name: str) -> str:
+        if name.endswith(QUANTIZED_SUFFIX):
+            name = name[:-len(QUANTIZED_SUFFIX)]
+        if name in ModelPaths.paths:
+            return ModelPaths.paths[name]
+        return os.path.join(ModelPaths.models_dir, ModelPaths.file_name(name))
+
+    @staticmethod
+    def numpy_path(name: str) -> str:
+        return os.path.splitext(ModelPaths.path(name))[0] + ".npz"
+
+    @staticmethod
+    def rollout_policy_path() -> str:
+        return os.path.join(ModelPaths.models_dir, ROLLOUT_POLICY_FILE)
@@ -0,0 +1,101 @@
+from typing import Dict, List, Tuple, Optional
+
+import numpy as np
+
+# defaults of nn.LeakyReLU and nn.BatchNorm1d used by the torch models
+LEAKY_RELU_SLOPE = 0.01
+BATCH_NORM_EPS = 1e-5
+
+
+# Inference-only copy of TorchBaseline/TorchAllLayers as plain matmuls, loads without torch.
+# Batch norms are folded into the following linear layer, dropouts are dropped, both heads share one matmul.
+class NumpyModel:
+    def __init__(self, weights: List[np.ndarray], biases: List[np.ndarray], policy_size: int):
+        self.weights = [np.ascontiguousarray(weight, dtype=np.float32) for weight in weights]
+        self.biases = [np.ascontiguousarray(bias, dtype=np.float32) for bias in biases]
+        self.policy_size = policy_size
+        # outputs of every layer for the single-state path, so predict does not allocate per call
+        self.buffers = [np.empty(weight.shape[1], dtype=np.float32) for weight in self.weights]
+        self.activation_buffers = [np.empty(weight.shape[1], dtype=np.float32) for weight in self.weights]
+
+    @property
+    def features_count(self) -> int:
+        return self.weights[0].shape[0]
+
+    # buffers are per model, use one model per thread for single-state predictions
+    def predict(self, features: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        x = np.asarray(features, dtype=np.float32)
+        last = len(self.weights) - 1
+        for i, (weight, bias) in enumerate(zip(self.weights, self.biases)):
+            out = self.buffers[i]
+            np.dot(x, weight, out=out)
+            out += bias
+            if i < last:
+                np.multiply(out, LEAKY_RELU_SLOPE, out=self.activation_buffers[i])
+                np.maximum(out, self.activation_buffers[i], out=out)
+            x = out
+        return x[:self.policy_size].copy(), x[self.policy_size:].copy()
+
+    def predict_batch(self, features: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        x = np.asarray(features, dtype=np.float32)
+        last = len(self.weights) - 1
+        for i, (weight, bias) in enumerate(zip(self.weights, self.biases)):
+            x = x @ weight
+            x += bias
+            if i < last:
+                np.maximum(x, x * LEAKY_RELU_SLOPE, out=x)
+        return x[:, :self.policy_size], x[:, self.policy_size:]
+
+    def save(self, path: str):
+        arrays = {"policy_size": np.array(self.policy_size)}
+        for i, (weight, bias) in enumerate(zip(self.weights, self.biases)):
+            arrays[f"weight_{i}"] = weight
+            arrays[f"bias_{i}"] = bias
+        np.savez(path, **arrays)
+
+    @staticmethod
+    def load(path: str) -> "NumpyModel":
+        with np.load(path) as data:
+            layers_count = sum(1 for key in data.files if key.startswith("weight_"))
+            weights = [data[f"weight_{i}"] for i in range(layers_count)]
+            biases = [data[f"bias_{i}"] for i in range(layers_count)]
+            return NumpyModel(weights, biases, int(data["policy_size"]))
+
+    @staticmethod
+    def from_torch(model) -> "NumpyModel":
+        model.eval()
+        state_dict = {key: value.detach().cpu().numpy() for key, value in model.state_dict().items()}
+        return NumpyModel.from_state_dict(state_dict)
+
+    @staticmethod
+    def from_state_dict(state_dict: Dict[str, np.ndarray]) -> "NumpyModel":
+        weights, biases = [], []
+        # pending batch norm as x * scale + shift, applied to the input of the next linear layer
+        scale: Optional[np.ndarray] = None
+        shift: Optional[np.ndarray] = None
+
+        def add_linear(weight: np.ndarray, bias: np.ndarray):
+            nonlocal scale, shift
+            weight = weight.T.astype(np.float64)
+            bias = bias.astype(np.float64)
+            if scale is not None:
+                bias = bias + shift @ weight
+                weight = weight * scale[:, None]
+                scale, shift = None, None
+            weights.append(weight)
+            biases.append(bias)
+
+        indices = sorted({int(key.split(".")[1]) for key in state_dict if key.startswith("backbone.")})
+        for index in indices:
+            prefix = f"backbone.{index}."
+            if prefix + "running_mean" in state_dict:
+                scale = state_dict[prefix + "weight"] / np.sqrt(state_dict[prefix + "running_var"] + BATCH_NORM_EPS)
+                shift = state_dict[prefix + "bias"] - state_dict[prefix + "running_mean"] * scale
+                scale, shift = scale.astype(np.float64), shift.astype(np.float64)
+            else:
+                add_linear(state_dict[prefix + "weight"], state_dict[prefix + "bias"])
+
+        policy_size = state_dict["head_policy.weight"].shape[0]
+        add_linear(np.concatenate([state_dict["head_policy.weight"], state_dict["head_value.weight"]]),
+                   np.concatenate([state_dict["head_policy.bias"], state_dict["head_value.bias"]]))
+        return NumpyModel(weights, biases, policy_size)
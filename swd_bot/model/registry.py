@@ -0,0 +1,92 @@
+import os
+import threading
+from typing import Dict, Tuple, Type, Any, Optional, Sequence
+
+import torch
+from torch import nn
+
+from swd_bot.model.model_paths import ModelPaths, MODEL_FILES, DEFAULT_MODEL, QUANTIZED_SUFFIX, STUDENT_SUFFIX
+from swd_bot.model.numpy_models import NumpyModel
+from swd_bot.model.torch_models import TorchBaseline
+
+# name -> (model class, constructor arguments), weights files are in MODEL_FILES
+MODEL_SPECS: Dict[str, Tuple[Type[nn.Module], Tuple[Any, ...]]] = {
+    "manual_v2": (TorchBaseline, (125, 0, [200])),
+}
+
+
+# Process-wide cache of loaded models, every model file is read once and shared read-only by all agents
+class ModelRegistry:
+    models: Dict[str, nn.Module] = {}
+    lock = threading.Lock()
+
+    @staticmethod
+    def configure(models_dir: Optional[str] = None, paths: Optional[Dict[str, str]] = None):
+        with ModelRegistry.lock:
+            if models_dir is not None:
+                ModelPaths.models_dir = models_dir
+            if paths is not None:
+                ModelPaths.paths.update(paths)
+            ModelRegistry.models.clear()
+
+    @staticmethod
+    def register(name: str, model_class: Type[nn.Module], arguments: Tuple[Any, ...], path: str):
+        with ModelRegistry.lock:
+            MODEL_SPECS[name] = (model_class, arguments)
+            MODEL_FILES[name] = os.path.basename(path)
+            ModelPaths.paths[name] = path
+            ModelRegistry.models.pop(name, None)
+
+    @staticmethod
+    def spec(name: str) -> Tuple[Type[nn.Module], Tuple[Any, ...]]:
+        if name in MODEL_SPECS:
+            return MODEL_SPECS[name]
+        teacher, _, hidden = name.rpartition(STUDENT_SUFFIX)
+        if teacher not in MODEL_SPECS:
+            raise KeyError(name)
+        _, arguments = MODEL_SPECS[teacher]
+        hidden_features_count = [int(features_count) for features_count in hidden.split("x")]
+        return TorchBaseline, (arguments[0], arguments[1], hidden_features_count)
+
+    @staticmethod
+    def path(name: str) -> str:
+        return ModelPaths.path(name)
+
+    @staticmethod
+    def get(name: str = DEFAULT_MODEL) -> nn.Module:
+        model = ModelRegistry.models.get(name)
+        if model is not None:
+            return model
+        with ModelRegistry.lock:
+            if name not in ModelRegistry.models:
+                ModelRegistry.models[name] = ModelRegistry.load(name)
+            return ModelRegistry.models[name]
+
+    @staticmethod
+    def load(name: str) -> nn.Module:
+        if name.endswith(QUANTIZED_SUFFIX):
+            return ModelRegistry.quantize(ModelRegistry.load(name[:-len(QUANTIZED_SUFFIX)]))
+        model_class, arguments = ModelRegistry.spec(name)
+        model = model_class(*arguments)
+        model.load_state_dict(torch.load(ModelRegistry.path(name), map_location="cpu"))
+        model.eval()
+        # the shared module is never trained, so no thread builds autograd graphs on it
+        model.requires_grad_(False)
+        return model
+
+    @staticmethod
+    def quantize(model: nn.Module) -> nn.Module:
+        # weights of linear layers are stored in int8, activations are quantized on the fly per batch
+        return torch.quantization.quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8)
+
+    @staticmethod
+    def preload(names: Sequence[str] = (DEFAULT_MODEL,)):
+        for name in names:
+            ModelRegistry.get(name)
+
+    @staticmethod
+    def export_numpy(name: str = DEFAULT_MODEL, path: Optional[str] = None) -> str:
+        if path is None:
+            path = ModelPaths.numpy_path(name)
+        NumpyModel.from_torch(ModelRegistry.get(name)).save(path)
+        return path
@@ -5,14 +5,21 @@ from fastapi import FastAPI
 from swd.game import Game
 from swd.states.game_state import GameStatus
 
+from swd_bot.action_codec import ActionCodec
 from swd_bot.agents.mcts_agent import MCTSAgent
 from swd_bot.agents.torch_agent import TorchAgent
-from swd_bot.thirdparty.swdio import SwdioLoader, ACTIONS_MAP
+from swd_bot.model.registry import ModelRegistry
+from swd_bot.thirdparty.swdio import SwdioLoader, REVERSED_ACTIONS_MAP
 
 
 app = FastAPI()
 
 
+@app.on_event("startup")
+def preload_models():
+    ModelRegistry.preload()
+
+
 @app.post("/7wd-bot/state/")
 def process_game_state(state_description: Dict[str, Any]):
     state = SwdioLoader.parse_state(state_description)
@@ -22,19 +29,19 @@ def process_game_state(state_description: Dict[str, Any]):
         actions = Game.get_available_actions(state)
         selected_action = agent.choose_action(state, actions)
         logging.info(selected_action)
-        for action_id, action_type in ACTIONS_MAP.items():
-            if action_type == type(selected_action):
-                encoded_action = SwdioLoader.encode_action(selected_action)
-                if state.game_status == GameStatus.PICK_PROGRESS_TOKEN:
-                    encoded_action["id"] = 3
-                elif state.game_status == GameStatus.PICK_REST_PROGRESS_TOKEN:
-                    encoded_action["id"] = 9
-                elif state.game_status == GameStatus.PICK_START_PLAYER:
-                    if state.current_player_index == encoded_action["player"]:
-                        encoded_action["player"] = state_description["state"]["me"]["name"]
-                    else:
-                        encoded_action["player"] = state_description["state"]["enemy"]["name"]
-                return encoded_action
+        code = ActionCodec.encode(selected_action)
+        if ActionCodec.kind(code) in REVERSED_ACTIONS_MAP:
+            encoded_action = SwdioLoader.encode_action_code(code)
+            if state.game_status == GameStatus.PICK_PROGRESS_TOKEN:
+                encoded_action["id"] = 3
+            elif state.game_status == GameStatus.PICK_REST_PROGRESS_TOKEN:
+                encoded_action["id"] = 9
+            elif state.game_status == GameStatus.PICK_START_PLAYER:
+                if state.current_player_index == encoded_action["player"]:
+                    encoded_action["player"] = state_description["state"]["me"]["name"]
+                else:
+                    encoded_action["player"] = state_description["state"]["enemy"]["name"]
+            return encoded_action
 
     return {"winner": state.winner}
 
@@ -57,9 +64,9 @@ def process_game_log(log: List[Dict[str, Any]]):
         actions = Game.get_available_actions(state)
         selected_action = agent.choose_action(state, actions)
         logging.info(selected_action)
-        for action_id, action_type in ACTIONS_MAP.items():
-            if action_type == type(selected_action):
-                return SwdioLoader.encode_action(selected_action)
+        code = ActionCodec.encode(selected_action)
+        if ActionCodec.kind(code) in REVERSED_ACTIONS_MAP:
+            return SwdioLoader.encode_action_code(code)
 
     return {"winner": state.winner}
 
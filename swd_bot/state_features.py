@@ -70,28 +70,56 @@ class StateFeatures:
 
     @staticmethod
     def extract_manual_state_features(state: GameState) -> List[int]:
-        features: List[int] = [int(i == state.age) for i in range(3)]
+        features: List[int] = StateFeatures.manual_age_features(state)
 
-        features.extend([int(x in state.progress_tokens) for x in EntityManager.progress_token_names()])
+        features.extend(StateFeatures.manual_tokens_features(state))
 
         for i, player_state in enumerate(state.players_state):
             features.append(player_state.coins)
-            features.extend(list(Game.points(state, i)))
-            unbuilt_wonders = [x[0] for x in player_state.wonders if x[1] is None]
-            features.append(len(unbuilt_wonders))
-            if player_state.bonuses[BONUSES.index("theology")] > 0:
-                features.append(len(unbuilt_wonders))
-            else:
-                features.append(len([x for x in unbuilt_wonders
-                                     if INSTANT_BONUSES.index("double_turn") in EntityManager.wonder(x).instant_bonuses]))
-            assets = Player.assets(player_state, Player.resources(state.players_state[1 - i]), None)
-            features.extend(list(assets.resources))
-            features.extend(list(assets.resources_cost))
-            features.append(np.count_nonzero(player_state.bonuses[SCIENTIFIC_SYMBOLS_RANGE]))
+            features.extend(StateFeatures.manual_points_features(state, i))
+            features.extend(StateFeatures.manual_wonders_features(state, i))
+            features.extend(StateFeatures.manual_assets_features(state, i))
+            features.extend(StateFeatures.manual_science_features(state, i))
 
         features.append(state.military_track_state.conflict_pawn)
 
-        available_cards = [x[0] for x in CardsBoard.available_cards(state.cards_board_state)]
-        features.extend([int(card_id in available_cards) for card_id in range(EntityManager.cards_count())])
+        features.extend(StateFeatures.manual_board_features(state))
 
         return features
+
+    @staticmethod
+    def manual_age_features(state: GameState) -> List[int]:
+        return [int(i == state.age) for i in range(3)]
+
+    @staticmethod
+    def manual_tokens_features(state: GameState) -> List[int]:
+        return [int(x in state.progress_tokens) for x in EntityManager.progress_token_names()]
+
+    @staticmethod
+    def manual_points_features(state: GameState, player: int) -> List[int]:
+        return list(Game.points(state, player))
+
+    @staticmethod
+    def manual_wonders_features(state: GameState, player: int) -> List[int]:
+        player_state = state.players_state[player]
+        unbuilt_wonders = [x[0] for x in player_state.wonders if x[1] is None]
+        if player_state.bonuses[BONUSES.index("theology")] > 0:
+            return [len(unbuilt_wonders), len(unbuilt_wonders)]
+        return [len(unbuilt_wonders),
+                len([x for x in unbuilt_wonders
+                     if INSTANT_BONUSES.index("double_turn") in EntityManager.wonder(x).instant_bonuses])]
+
+    @staticmethod
+    def manual_assets_features(state: GameState, player: int) -> List[int]:
+        assets = Player.assets(state.players_state[player], Player.resources(state.players_state[1 - player]), None)
+        return list(assets.resources) + list(assets.resources_cost)
+
+    @staticmethod
+    def manual_science_features(state: GameState, player: int) -> List[int]:
+        return [np.count_nonzero(state.players_state[player].bonuses[SCIENTIFIC_SYMBOLS_RANGE])]
+
+    @staticmethod
+    def manual_board_features(state: GameState) -> List[int]:
+        available_cards = np.zeros(EntityManager.cards_count(), dtype=int)
+        available_cards[[x[0] for x in CardsBoard.available_cards(state.cards_board_state)]] = 1
+        return available_cards.tolist()
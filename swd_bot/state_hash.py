@@ -0,0 +1,86 @@
+from typing import List
+
+import numpy as np
+from swd.cards_board import AGES, NO_CARD, CLOSED_CARD, CLOSED_PURPLE_CARD
+from swd.entity_manager import EntityManager
+from swd.states.game_state import GameState
+
+CARDS_COUNT = EntityManager.cards_count()
+WONDERS_COUNT = EntityManager.wonders_count()
+PROGRESS_TOKEN_INDICES = {name: i for i, name in enumerate(EntityManager.progress_token_names())}
+TOKENS_COUNT = len(PROGRESS_TOKEN_INDICES)
+
+BOARD_CELLS = np.array(AGES)[0].size
+BOARD_VALUE_OFFSET = -min(NO_CARD, CLOSED_CARD, CLOSED_PURPLE_CARD)
+BOARD_VALUES = CARDS_COUNT + BOARD_VALUE_OFFSET
+MAX_AGE = 4
+MAX_STATUS = 32
+MAX_COINS = 256
+MAX_PAWN = 32
+MAX_MILITARY_TOKEN = 16
+MILITARY_TOKENS = 4
+
+AGE_OFFSET = 0
+CURRENT_PLAYER_OFFSET = AGE_OFFSET + MAX_AGE + 1
+STATUS_OFFSET = CURRENT_PLAYER_OFFSET + 2
+DOUBLE_TURN_OFFSET = STATUS_OFFSET + MAX_STATUS
+BOARD_OFFSET = DOUBLE_TURN_OFFSET + 2
+BOARD_TOKENS_OFFSET = BOARD_OFFSET + BOARD_CELLS * BOARD_VALUES
+REST_TOKENS_OFFSET = BOARD_TOKENS_OFFSET + TOKENS_COUNT
+DISCARD_PILE_OFFSET = REST_TOKENS_OFFSET + TOKENS_COUNT
+DRAFT_WONDERS_OFFSET = DISCARD_PILE_OFFSET + CARDS_COUNT
+PAWN_OFFSET = DRAFT_WONDERS_OFFSET + WONDERS_COUNT
+MILITARY_TOKENS_OFFSET = PAWN_OFFSET + MAX_PAWN
+PLAYERS_OFFSET = MILITARY_TOKENS_OFFSET + MILITARY_TOKENS * MAX_MILITARY_TOKEN
+PLAYER_CARDS_OFFSET = 0
+PLAYER_COINS_OFFSET = PLAYER_CARDS_OFFSET + CARDS_COUNT
+PLAYER_TOKENS_OFFSET = PLAYER_COINS_OFFSET + MAX_COINS
+PLAYER_WONDERS_OFFSET = PLAYER_TOKENS_OFFSET + TOKENS_COUNT
+PLAYER_KEYS = PLAYER_WONDERS_OFFSET + WONDERS_COUNT * 2
+KEYS_COUNT = PLAYERS_OFFSET + 2 * PLAYER_KEYS
+
+ZOBRIST_TABLE = np.random.default_rng(7).integers(0, np.iinfo(np.uint64).max, size=KEYS_COUNT, dtype=np.uint64)
+
+
+class StateHash:
+    @staticmethod
+    def keys(state: GameState) -> List[np.ndarray]:
+        status = [
+            AGE_OFFSET + min(state.age + 1, MAX_AGE),
+            CURRENT_PLAYER_OFFSET + state.current_player_index,
+            STATUS_OFFSET + min(state.game_status.value, MAX_STATUS - 1),
+            DOUBLE_TURN_OFFSET + int(state.is_double_turn),
+        ]
+
+        card_places = np.asarray(state.cards_board_state.card_places, dtype=np.int64).ravel()
+        board = BOARD_OFFSET + np.arange(len(card_places)) * BOARD_VALUES + card_places + BOARD_VALUE_OFFSET
+
+        shared = [BOARD_TOKENS_OFFSET + PROGRESS_TOKEN_INDICES[x] for x in state.progress_tokens]
+        shared.extend(REST_TOKENS_OFFSET + PROGRESS_TOKEN_INDICES[x] for x in state.rest_progress_tokens)
+        shared.extend(DISCARD_PILE_OFFSET + x for x in state.discard_pile)
+        shared.extend(DRAFT_WONDERS_OFFSET + x for x in state.wonders)
+
+        military_track_state = state.military_track_state
+        military = [PAWN_OFFSET + MAX_PAWN // 2 + military_track_state.conflict_pawn]
+        for i, value in enumerate(military_track_state.military_tokens):
+            military.append(MILITARY_TOKENS_OFFSET + i * MAX_MILITARY_TOKEN + min(value, MAX_MILITARY_TOKEN - 1))
+
+        keys = [np.array(status), board, np.array(shared, dtype=np.int64), np.array(military)]
+        for i, player_state in enumerate(state.players_state):
+            offset = PLAYERS_OFFSET + i * PLAYER_KEYS
+            player = [offset + PLAYER_CARDS_OFFSET + x for x in player_state.cards]
+            player.append(offset + PLAYER_COINS_OFFSET + min(player_state.coins, MAX_COINS - 1))
+            player.extend(offset + PLAYER_TOKENS_OFFSET + PROGRESS_TOKEN_INDICES[x]
+                          for x in player_state.progress_tokens)
+            player.extend(offset + PLAYER_WONDERS_OFFSET + 2 * wonder_id + int(card_id is not None)
+                          for wonder_id, card_id in player_state.wonders)
+            keys.append(np.array(player, dtype=np.int64))
+        return keys
+
+    @staticmethod
+    def hash(state: GameState) -> int:
+        return StateHash.combine(StateHash.keys(state))
+
+    @staticmethod
+    def combine(keys: List[np.ndarray]) -> int:
+        return int(np.bitwise_xor.reduce(ZOBRIST_TABLE[np.concatenate(keys)]))
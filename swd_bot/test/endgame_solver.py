@@ -0,0 +1,54 @@
+import math
+from pathlib import Path
+from typing import List, Union, Type
+
+from swd.agents import Agent
+from swd.game import Game
+from swd.states.game_state import GameState
+
+from swd_bot.mcts.endgame_solver import EndgameSolver
+from swd_bot.test.game_processor import process_games
+from swd_bot.thirdparty.loader import GameLogLoader
+
+
+def minimax(solver: EndgameSolver, state: GameState) -> float:
+    if Game.is_finished(state):
+        return solver.terminal_score(state)
+    scores = []
+    for action in Game.get_available_actions(state):
+        child = state.clone()
+        Game.apply_action(child, action)
+        scores.append(minimax(solver, child))
+    return max(scores) if state.current_player_index == solver.player else min(scores)
+
+
+def test_endgame_solver(state: GameState, max_cards: int = 4):
+    solver = EndgameSolver(max_cards)
+    assert solver.applies(state)
+    actions = Game.get_available_actions(state)
+    action = solver.solve(state, actions, math.inf)
+    assert action is not None
+
+    scores = []
+    for candidate in actions:
+        child = state.clone()
+        Game.apply_action(child, candidate)
+        scores.append(minimax(solver, child))
+    child = state.clone()
+    Game.apply_action(child, action)
+    assert minimax(solver, child) == max(scores)
+
+
+def test_game_endgame_solver(state: GameState, agents: List[Agent], max_cards: int = 4):
+    # the recorded game is replayed up to the first position the solver takes over
+    solver = EndgameSolver(max_cards)
+    while not Game.is_finished(state):
+        if solver.applies(state):
+            test_endgame_solver(state, max_cards)
+            return
+        actions = Game.get_available_actions(state)
+        Game.apply_action(state, agents[state.current_player_index].choose_action(state, actions))
+
+
+def test_games_endgame_solver(path: Union[str, Path], loader: Type[GameLogLoader]):
+    process_games(path, loader, test_game_endgame_solver)
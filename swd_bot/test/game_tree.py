@@ -0,0 +1,94 @@
+import os
+import random
+import tempfile
+
+import numpy as np
+from swd.agents import RandomAgent
+from swd.game import Game
+from swd.states.game_state import GameState
+
+from swd_bot.mcts.game_tree import GameTree
+from swd_bot.mcts.mcts import MCTS
+
+
+def check_game_tree(tree: GameTree):
+    size = tree.size
+    assert tree.parent[GameTree.ROOT] == -1
+    assert len(tree.states) == len(tree.actions) == len(tree.priors) == size
+    assert tree.stored_states == sum(state is not None for state in tree.states)
+    assert tree.stored_actions == sum(len(actions) for actions in tree.actions if actions is not None)
+    # every node is reached from the root once, after its parent
+    order = tree.subtree(GameTree.ROOT)
+    assert np.array_equal(np.sort(order), np.arange(size))
+    positions = np.empty(size, dtype=np.int64)
+    positions[order] = np.arange(size)
+    assert (positions[tree.parent[1:size]] < positions[1:size]).all()
+
+    # children blocks fit their capacity, stay inside child_ids and don't overlap
+    counts = tree.children_count[:size]
+    capacities = tree.children_capacity[:size]
+    starts = tree.first_child[:size]
+    assert (counts <= capacities).all()
+    allocated = capacities > 0
+    assert (starts[allocated] >= 0).all()
+    assert (starts[allocated] + capacities[allocated] <= tree.child_ids_size).all()
+    used = np.zeros(tree.child_ids_size, dtype=np.int64)
+    for start, capacity in zip(starts[allocated].tolist(), capacities[allocated].tolist()):
+        used[start:start + capacity] += 1
+    assert (used <= 1).all()
+    for node in range(size):
+        children = tree.children(node)
+        assert (tree.parent[children] == node).all()
+        assert len(np.unique(children)) == len(children)
+    assert np.bincount(tree.parent[1:size], minlength=size).tolist() == counts.tolist()
+
+    # add_node relies on the slots past size holding the empty node values
+    for name, (_, value) in GameTree.NODE_ARRAYS.items():
+        assert (getattr(tree, name)[size:tree.capacity] == value).all()
+
+
+def check_save_load(tree: GameTree, root_state: GameState):
+    saved = tree.subtree(GameTree.ROOT, stop_at_chance=True)
+    handle, path = tempfile.mkstemp(suffix=".npz")
+    os.close(handle)
+    try:
+        tree.save(path)
+        loaded = GameTree.load(path, root_state)
+    finally:
+        os.remove(path)
+    check_game_tree(loaded)
+    assert loaded.size == len(saved)
+    for name in GameTree.SAVED_ARRAYS:
+        if name != "parent":
+            assert np.array_equal(getattr(loaded, name)[:loaded.size], getattr(tree, name)[saved])
+    assert np.array_equal(saved[loaded.parent[1:loaded.size]], tree.parent[saved[1:]])
+    assert np.array_equal(loaded.children_count[:loaded.size],
+                          np.bincount(loaded.parent[1:loaded.size], minlength=loaded.size))
+
+
+def test_game_tree(state: GameState, simulations: int = 300, moves: int = 10):
+    mcts = MCTS(state, RandomAgent(), RandomAgent(), lambda s: 0.5)
+    for _ in range(moves):
+        if Game.is_finished(state):
+            break
+        # expansion
+        mcts.run(simulations=simulations, playout_limit=20, progress_bar=False)
+        check_game_tree(mcts.tree)
+        check_save_load(mcts.tree, state)
+
+        # prune and compact
+        mcts.tree.prune(max(mcts.tree.size // 2, 1))
+        check_game_tree(mcts.tree)
+        mcts.tree.compact(mcts.tree.subtree(GameTree.ROOT))
+        check_game_tree(mcts.tree)
+
+        # shrink_tree
+        action = random.choice(Game.get_available_actions(state))
+        Game.apply_action(state, action)
+        mcts.shrink_tree(action, state)
+        check_game_tree(mcts.tree)
+
+
+def test_game_trees(games: int = 10):
+    for _ in range(games):
+        test_game_tree(Game.create())
@@ -0,0 +1,52 @@
+import time
+from pathlib import Path
+from typing import List, Union, Type, Dict
+
+import numpy as np
+from swd.agents import Agent
+from swd.game import Game
+from swd.states.game_state import GameState
+
+from swd_bot.data_providers.incremental_feature_extractor import IncrementalFeatureExtractor
+from swd_bot.state_features import StateFeatures
+from swd_bot.test.game_processor import process_games
+from swd_bot.thirdparty.loader import GameLogLoader
+
+
+def test_incremental_features(state: GameState, agents: List[Agent]):
+    extractor = IncrementalFeatureExtractor(state)
+    while not Game.is_finished(state):
+        assert np.array_equal(extractor.buffer, StateFeatures.extract_manual_state_features(state))
+        actions = Game.get_available_actions(state)
+        agent = agents[state.current_player_index]
+        extractor.apply_action(agent.choose_action(state, actions))
+    assert np.array_equal(extractor.buffer, StateFeatures.extract_manual_state_features(state))
+
+
+def test_games_incremental_features(path: Union[str, Path], loader: Type[GameLogLoader]):
+    process_games(path, loader, test_incremental_features)
+
+
+def measure_incremental_features(state: GameState, agents: List[Agent], timings: Dict[str, float]):
+    extractor = IncrementalFeatureExtractor(state)
+    while not Game.is_finished(state):
+        actions = Game.get_available_actions(state)
+        agent = agents[state.current_player_index]
+        Game.apply_action(state, agent.choose_action(state, actions))
+
+        start = time.perf_counter()
+        StateFeatures.extract_manual_state_features(state)
+        timings["full"] += time.perf_counter() - start
+
+        start = time.perf_counter()
+        extractor.update()
+        timings["incremental"] += time.perf_counter() - start
+        timings["positions"] += 1
+
+
+def measure_games_incremental_features(path: Union[str, Path], loader: Type[GameLogLoader]):
+    timings = {"full": 0.0, "incremental": 0.0, "positions": 0}
+    process_games(path, loader, lambda state, agents: measure_incremental_features(state, agents, timings))
+    positions = max(timings["positions"], 1)
+    print(f"Full recompute: {timings['full'] / positions * 1e6:.1f} us per position")
+    print(f"Incremental update: {timings['incremental'] / positions * 1e6:.1f} us per position")
@@ -0,0 +1,57 @@
+from typing import List
+
+import numpy as np
+import torch
+from swd.states.game_state import GameState
+from torch import nn
+
+from swd_bot.agents.numpy_agent import NumpyAgent
+from swd_bot.agents.torch_agent import TorchAgent
+from swd_bot.model.model_paths import DEFAULT_MODEL
+from swd_bot.model.numpy_models import NumpyModel
+from swd_bot.model.torch_models import TorchAllLayers, TorchBaseline
+
+
+def test_numpy_model_parity(model: nn.Module, samples: int = 64, atol: float = 1e-4):
+    model.eval()
+    numpy_model = NumpyModel.from_torch(model)
+    features = np.random.randn(samples, numpy_model.features_count).astype(np.float32)
+    with torch.no_grad():
+        policy, value = model(torch.from_numpy(features), None)
+
+    batch_policy, batch_value = numpy_model.predict_batch(features)
+    assert np.allclose(batch_policy, policy.numpy(), atol=atol)
+    assert np.allclose(batch_value, value.numpy(), atol=atol)
+    for i in range(samples):
+        single_policy, single_value = numpy_model.predict(features[i])
+        assert np.allclose(single_policy, policy[i].numpy(), atol=atol)
+        assert np.allclose(single_value, value[i].numpy(), atol=atol)
+
+
+def test_numpy_models_parity():
+    test_numpy_model_parity(TorchBaseline(125, 0, [200]))
+
+    model = TorchAllLayers(125, 0, [200, 100])
+    # untrained batch norms are identities, random statistics make the folding observable
+    for module in model.backbone:
+        if isinstance(module, nn.BatchNorm1d):
+            module.running_mean.uniform_(-1, 1)
+            module.running_var.uniform_(0.5, 2)
+            nn.init.uniform_(module.weight, 0.5, 1.5)
+            nn.init.uniform_(module.bias, -1, 1)
+    test_numpy_model_parity(model)
+
+
+def test_numpy_agent_parity(states: List[GameState], model_name: str = DEFAULT_MODEL, atol: float = 1e-4):
+    torch_agent = TorchAgent(model_name)
+    numpy_agent = NumpyAgent(model_name)
+    for state in states:
+        torch_actions, torch_winners = torch_agent.predict(state)
+        numpy_actions, numpy_winners = numpy_agent.predict(state)
+        assert np.allclose(numpy_actions, torch_actions, atol=atol)
+        assert np.allclose(numpy_winners, torch_winners, atol=atol)
+
+    torch_actions, torch_winners = torch_agent.predict_batch(states)
+    numpy_actions, numpy_winners = numpy_agent.predict_batch(states)
+    assert np.allclose(numpy_actions, torch_actions, atol=atol)
+    assert np.allclose(numpy_winners, torch_winners, atol=atol)
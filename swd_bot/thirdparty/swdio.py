@@ -15,6 +15,7 @@ from swd.states.game_state import GameState, GameStatus
 from swd.states.military_state_track import MilitaryTrackState
 from swd.states.player_state import PlayerState
 
+from swd_bot.action_codec import ActionCodec, ACTION_OFFSETS, ACTION_TYPES, CARDS_COUNT
 from swd_bot.thirdparty.loader import GameLogLoader
 from swd_bot.thirdparty.sevenee import SeveneeLoader
 
@@ -111,6 +112,10 @@ ACTIONS_MAP: Dict[int, type] = {
 }
 
 
+REVERSED_ACTIONS_MAP: Dict[type, int] = {v: k for k, v in ACTIONS_MAP.items()}
+REVERSED_CARDS_MAP: Dict[int, int] = {v: k for k, v in CARDS_MAP.items()}
+
+
 PHASE_TO_GAME_STATUS: Dict[int, GameStatus] = {
     1: GameStatus.PICK_WONDER,
     2: GameStatus.NORMAL_TURN,
@@ -198,18 +203,27 @@ class SwdioLoader(GameLogLoader):
 
     @staticmethod
     def encode_action(action: Action) -> Dict[str, Any]:
-        reversed_actions_map = {v: k for k, v in ACTIONS_MAP.items()}
-        reversed_cards_map = {v: k for k, v in CARDS_MAP.items()}
-        result = {"id": reversed_actions_map[type(action)]}
-
-        if hasattr(action, "card_id"):
-            result["card"] = reversed_cards_map[action.card_id]
-        if hasattr(action, "wonder_id"):
-            result["wonder"] = action.wonder_id + 1
-        if hasattr(action, "progress_token"):
-            result["token"] = EntityManager.progress_token_names().index(action.progress_token) + 1
-        if hasattr(action, "player_index"):
-            result["player"] = action.player_index
+        return SwdioLoader.encode_action_code(ActionCodec.encode(action))
+
+    @staticmethod
+    def encode_action_code(code: int) -> Dict[str, Any]:
+        kind_index = ActionCodec.kind_index(code)
+        value = int(code - ACTION_OFFSETS[kind_index])
+        action_type = ACTION_TYPES[kind_index]
+        result = {"id": REVERSED_ACTIONS_MAP[action_type]}
+
+        if action_type == BuildWonderAction:
+            wonder_id, card_id = divmod(value, CARDS_COUNT)
+            result["card"] = REVERSED_CARDS_MAP[card_id]
+            result["wonder"] = wonder_id + 1
+        elif action_type in (BuyCardAction, DiscardCardAction, DestroyCardAction, PickDiscardedCardAction):
+            result["card"] = REVERSED_CARDS_MAP[value]
+        elif action_type == PickWonderAction:
+            result["wonder"] = value + 1
+        elif action_type == PickProgressTokenAction:
+            result["token"] = value + 1
+        elif action_type == PickStartPlayerAction:
+            result["player"] = value
 
         return result
 
@@ -0,0 +1,100 @@
+import copy
+from typing import List
+
+import hydra
+import torch
+import torch.nn.functional as F
+from omegaconf import DictConfig
+from torch import nn, optim
+
+from swd_bot.data_providers.torch_data_provider import TorchDataProvider
+from swd_bot.model.registry import ModelRegistry, QUANTIZED_SUFFIX, STUDENT_SUFFIX
+from swd_bot.train.evaluate import action_accuracy, compare_models
+
+
+def distill_student(teacher: nn.Module,
+                    student: nn.Module,
+                    data_provider: TorchDataProvider,
+                    epochs: int,
+                    temperature: float,
+                    soft_weight: float) -> nn.Module:
+    optimizer = optim.Adam(student.parameters(), lr=0.001)
+
+    best_accuracy = -1
+    best_model = None
+    for epoch in range(epochs):
+        student.train()
+        running_loss = 0.0
+        count = 0
+        for (features, cards), (true_actions, _) in data_provider.train_data_loader:
+            with torch.no_grad():
+                teacher_actions, teacher_winners = teacher(features, cards)
+
+            optimizer.zero_grad()
+
+            pred_actions, pred_winners = student(features, cards)
+            # softened teacher policy plus the recorded moves, the value head copies the teacher
+            soft_loss = F.kl_div(F.log_softmax(pred_actions / temperature, dim=1),
+                                 F.softmax(teacher_actions / temperature, dim=1),
+                                 reduction="batchmean") * temperature ** 2
+            hard_loss = F.cross_entropy(pred_actions, true_actions)
+            value_loss = F.kl_div(F.log_softmax(pred_winners, dim=1),
+                                  F.softmax(teacher_winners, dim=1),
+                                  reduction="batchmean")
+            loss = soft_weight * soft_loss + (1 - soft_weight) * hard_loss + value_loss
+            loss.backward()
+            optimizer.step()
+
+            running_loss += loss.item()
+            count += 1
+
+        student.eval()
+        accuracy = action_accuracy(student, data_provider.valid_data_loader)
+        print(f"[{epoch + 1}] loss: {running_loss / count:.3f}, actions: {accuracy}%")
+        if accuracy > best_accuracy:
+            best_accuracy = accuracy
+            best_model = copy.deepcopy(student.state_dict())
+
+    student.load_state_dict(best_model)
+    student.eval()
+    student.requires_grad_(False)
+    return student
+
+
+def student_name(teacher_name: str, hidden_features_count: List[int]) -> str:
+    return f"{teacher_name}{STUDENT_SUFFIX}{'x'.join(map(str, hidden_features_count))}"
+
+
+@hydra.main(config_path="configs", config_name="compress")
+def compress(config: DictConfig):
+    train_config = config["train"]
+    config = config["compress"]
+
+    ModelRegistry.configure(models_dir=config["models_dir"])
+    data_provider: TorchDataProvider = hydra.utils.instantiate(train_config["data_provider"])
+
+    teacher_name = config["teacher"]
+    teacher = ModelRegistry.get(teacher_name)
+    models = {
+        teacher_name: teacher,
+        teacher_name + QUANTIZED_SUFFIX: ModelRegistry.load(teacher_name + QUANTIZED_SUFFIX),
+    }
+    for hidden_features_count in config["students"]:
+        name = student_name(teacher_name, list(hidden_features_count))
+        model_class, arguments = ModelRegistry.spec(name)
+        student = distill_student(teacher,
+                                  model_class(*arguments),
+                                  data_provider,
+                                  config["epochs"],
+                                  config["temperature"],
+                                  config["soft_weight"])
+        # saved under the registry name, so TorchAgent(name) and TorchAgent(name + "_int8") load it
+        torch.save(student.state_dict(), ModelRegistry.path(name))
+        models[name] = student
+        models[name + QUANTIZED_SUFFIX] = ModelRegistry.quantize(student)
+
+    print(compare_models(models, data_provider.test_data_loader).to_string())
+
+
+if __name__ == "__main__":
+    compress()
@@ -0,0 +1,55 @@
+import pickle
+from typing import Optional
+
+import numpy as np
+from swd.game import Game
+from swd.states.game_state import GameStatus
+from tqdm import tqdm
+
+from swd_bot.agents.linear_rollout_agent import LinearRolloutAgent, LINEAR_ACTION_TYPES
+from swd_bot.agents.torch_agent import TorchAgent
+from swd_bot.model.model_paths import ModelPaths
+
+
+def distill_rollout_policy(states_path: str = "../datasets/buy_discard_build/states_train.pkl",
+                           output_path: Optional[str] = None,
+                           epochs: int = 200,
+                           learning_rate: float = 0.05):
+    with open(states_path, "rb") as f:
+        states = pickle.load(f)
+
+    # the teacher distribution is the policy head restricted to the legal actions
+    torch_agent = TorchAgent()
+    types, cards, targets, counts = [], [], [], []
+    for state in tqdm(states):
+        if state.game_status != GameStatus.NORMAL_TURN:
+            continue
+        actions = Game.get_available_actions(state)
+        action_predictions, _ = torch_agent.predict(state)
+        action_types, action_cards = LinearRolloutAgent.action_features(actions)
+        types.append(action_types)
+        cards.append(action_cards)
+        targets.append(TorchAgent.normalize_actions(action_predictions, actions))
+        counts.append(len(actions))
+    types = np.concatenate(types)
+    cards = np.concatenate(cards)
+    targets = np.concatenate(targets)
+    counts = np.array(counts)
+    features = LinearRolloutAgent.card_features()[cards]
+
+    weights = np.zeros((len(LINEAR_ACTION_TYPES), features.shape[1]))
+    for epoch in range(epochs):
+        probs = LinearRolloutAgent.segment_softmax(LinearRolloutAgent.logits(weights, types, features), counts)
+        # cross entropy gradient of a softmax is the difference of the distributions
+        gradient = np.zeros_like(weights)
+        np.add.at(gradient, types, (probs - targets)[:, None] * features)
+        weights -= learning_rate * gradient / len(counts)
+        if (epoch + 1) % 10 == 0:
+            loss = -(targets * np.log(np.maximum(probs, 1e-12))).sum() / len(counts)
+            print(f"[{epoch + 1}] loss: {loss:.4f}")
+
+    np.savez(output_path if output_path is not None else ModelPaths.rollout_policy_path(), weights=weights)
+
+
+if __name__ == "__main__":
+    distill_rollout_policy()
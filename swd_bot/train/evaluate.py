@@ -0,0 +1,66 @@
+import io
+import time
+from typing import Dict, Tuple
+
+import pandas as pd
+import torch
+from torch import nn
+from torch.utils.data import DataLoader
+
+
+def action_accuracy(model: nn.Module, data_loader: DataLoader) -> float:
+    correct_actions = 0
+    total_pred = 0
+    with torch.inference_mode():
+        for (features, cards), (true_actions, _) in data_loader:
+            pred_actions, _ = model(features, cards)
+            correct_actions += (pred_actions.argmax(dim=1) == true_actions).sum().item()
+            total_pred += len(true_actions)
+    return round(100 * correct_actions / max(total_pred, 1), 2)
+
+
+# milliseconds per state of single-state and batched forward passes
+def latency(model: nn.Module,
+            features: torch.Tensor,
+            cards: torch.Tensor,
+            batch_size: int = 64,
+            repeats: int = 200) -> Tuple[float, float]:
+    with torch.inference_mode():
+        model(features[:1], cards[:1])
+        start = time.perf_counter()
+        for i in range(repeats):
+            j = i % len(features)
+            model(features[j:j + 1], cards[j:j + 1])
+        single = (time.perf_counter() - start) / repeats
+
+        batch_features, batch_cards = features[:batch_size], cards[:batch_size]
+        model(batch_features, batch_cards)
+        start = time.perf_counter()
+        for _ in range(repeats):
+            model(batch_features, batch_cards)
+        batched = (time.perf_counter() - start) / repeats / len(batch_features)
+    return round(1000 * single, 4), round(1000 * batched, 4)
+
+
+def model_size(model: nn.Module) -> float:
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    return round(buffer.getbuffer().nbytes / 1024, 1)
+
+
+def compare_models(models: Dict[str, nn.Module],
+                   data_loader: DataLoader,
+                   batch_size: int = 64,
+                   repeats: int = 200) -> pd.DataFrame:
+    (features, cards), _ = next(iter(data_loader))
+    rows = []
+    for name, model in models.items():
+        single, batched = latency(model, features, cards, batch_size, repeats)
+        rows.append({
+            "model": name,
+            "accuracy": action_accuracy(model, data_loader),
+            "single_ms": single,
+            f"batch{batch_size}_ms_per_state": batched,
+            "size_kb": model_size(model),
+        })
+    return pd.DataFrame(rows).set_index("model")